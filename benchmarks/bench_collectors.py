@@ -0,0 +1,125 @@
+# bench_collectors.py - Per-tick latency and allocations of collectors and renders
+"""
+Per-tick latency and allocations of collectors and renders.
+
+Runs every collector and a full generate_layout render against synthetic
+procfs/sysfs trees of increasing size. Run from the repository root:
+  python -m benchmarks.bench_collectors [--quick] [--ticks N]
+"""
+
+import argparse
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import generate
+from hardware.hardware import get_cpu_data, get_disk_io
+from utils import procfs
+from utils.network import get_net_stats
+from utils.system_info import get_top_processes
+from utils.snapshot import take_snapshot
+from utils.utils import get_state
+
+# (label, cpus, pids, interfaces, disks); each varies one axis from the base
+SCENARIOS = [
+    ("base", 8, 100, 4, 4),
+    ("16 cpus", 16, 100, 4, 4),
+    ("64 cpus", 64, 100, 4, 4),
+    ("1k pids", 8, 1000, 4, 4),
+    ("10k pids", 8, 10000, 4, 4),
+    ("64 ifaces/disks", 8, 100, 64, 64),
+]
+QUICK = SCENARIOS[:2] + SCENARIOS[3:4]
+
+# Terminal sizes that select each layout mode
+MODES = {"minimal": (50, 14), "compact": (80, 22), "full": (140, 45)}
+
+COLLECTORS = [
+    ("get_cpu_data", get_cpu_data),
+    ("get_top_processes", lambda: get_top_processes(limit=8)),
+    ("get_net_stats", get_net_stats),
+    ("get_disk_io", get_disk_io),
+]
+
+
+def _reset_state():
+    """Forget deltas and caches from the previous tree."""
+    state = get_state()
+    state["procs"] = {"ticks": {}, "names": {}, "parents": {}, "uids": {}, "time": 0.0}
+    state["cpu"] = {"cpu_idle_time": {}, "cpu_idle_t": {}}
+
+
+def measure(fn, ticks):
+    """Median latency (us) and peak allocation (bytes) of one call."""
+    fn()  # warm up caches and delta state
+    samples = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(samples) * 1e6, peak
+
+
+def _render_fn(mode, snapshot, cold):
+    from rich.console import Console
+    from ui import cache
+    from ui.ui import generate_layout
+
+    width, height = MODES[mode]
+    os.environ["COLUMNS"], os.environ["LINES"] = str(width), str(height)
+    console = Console(file=io.StringIO(), width=width, height=height, force_terminal=True)
+    history = get_state()["history"]
+
+    def render():
+        if cold:
+            cache.clear()
+        console.file.seek(0)
+        console.file.truncate()
+        console.print(generate_layout(history, snapshot))
+    return render
+
+
+def run(scenarios, ticks, render=True):
+    print(f"{'scenario':<17} {'measure':<20} {'us/tick':>10} {'peak alloc':>12}")
+    for label, cpus, pids, ifaces, disks in scenarios:
+        root = tempfile.mkdtemp(prefix="tsm-bench-")
+        try:
+            generate(root, cpus=cpus, pids=pids, ifaces=ifaces, disks=disks)
+            procfs.set_root(root)
+            _reset_state()
+            for name, fn in COLLECTORS:
+                us, peak = measure(fn, ticks)
+                print(f"{label:<17} {name:<20} {us:10.1f} {peak:10d} B")
+            if render:
+                snapshot = take_snapshot()
+                for mode in MODES:
+                    # cold: every panel rebuilt; cached: inputs unchanged since last frame
+                    for cold in (True, False):
+                        us, peak = measure(_render_fn(mode, snapshot, cold), max(1, ticks // 10))
+                        name = f"render {mode}" + ("" if cold else " cached")
+                        print(f"{label:<17} {name:<20} {us:10.1f} {peak:10d} B")
+        finally:
+            procfs.set_root("/")
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="only a few small scenarios")
+    parser.add_argument("--ticks", type=int, default=50, help="timed calls per measure")
+    parser.add_argument("--no-render", action="store_true", help="skip generate_layout renders")
+    args = parser.parse_args()
+    run(QUICK if args.quick else SCENARIOS, args.ticks, render=not args.no_render)
+
+
+if __name__ == "__main__":
+    main()
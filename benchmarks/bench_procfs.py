@@ -0,0 +1,105 @@
+# bench_procfs.py - Syscall, allocation and latency cost of one tick of /proc reads
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_procfs [ticks]
+
+import glob
+import sys
+import time
+import tracemalloc
+
+from utils import procfs
+
+HOT_FILES = [
+    "/proc/stat",
+    "/proc/meminfo",
+    "/proc/net/dev",
+    "/proc/diskstats",
+    "/proc/loadavg",
+]
+SYSFS_FILES = sorted(
+    glob.glob("/sys/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_cur_freq")
+    + glob.glob("/sys/devices/system/cpu/cpu[0-9]*/cpufreq/cpuinfo_max_freq")
+    + glob.glob("/sys/devices/system/cpu/cpu[0-9]*/cpuidle/state*/time")
+)
+FILES = HOT_FILES + SYSFS_FILES
+
+_opens = 0
+
+
+def _audit(event, args):
+    global _opens
+    if event == "open":
+        _opens += 1
+
+
+def _read_syscalls():
+    """Read syscalls issued by this process so far (from /proc/self/io)."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("syscr:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def tick_open_read_close():
+    """What the collectors did before: open, read, split into lines, close."""
+    for path in FILES:
+        try:
+            with open(path) as f:
+                f.read().splitlines()
+        except OSError:
+            pass
+
+
+def tick_procfs():
+    """Persistent descriptors, one pread into a reused buffer."""
+    for path in FILES:
+        procfs.read_bytes(path)
+
+
+def measure(name, tick, ticks):
+    tick()  # warm up (opens the persistent descriptors once)
+
+    opens_before = _opens
+    syscr_before = _read_syscalls()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        tick()
+    elapsed = time.perf_counter() - start
+    syscr_after = _read_syscalls()
+    opens = (_opens - opens_before) / ticks
+
+    tracemalloc.start()
+    tick()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    tick()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    reads = None
+    if syscr_before is not None and syscr_after is not None:
+        reads = (syscr_after - syscr_before) / ticks
+    print(
+        f"{name:<22} {elapsed / ticks * 1e6:9.1f} us/tick"
+        f"  opens/tick {opens:5.1f}"
+        f"  reads/tick {reads if reads is None else round(reads, 1)!s:>6}"
+        f"  peak alloc/tick {peak - base:8d} B"
+    )
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    sys.addaudithook(_audit)
+    print(f"{len(FILES)} files per tick ({len(SYSFS_FILES)} sysfs), {ticks} ticks")
+    measure("open/read/close", tick_open_read_close, ticks)
+    measure("procfs.read_bytes", tick_procfs, ticks)
+    procfs.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# synthetic.py - Generate fake procfs/sysfs trees for benchmarking collectors
+
+import os
+import random
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _cpu_line(name, rng):
+    user, nice, system = rng.randrange(10**6), rng.randrange(10**4), rng.randrange(10**6)
+    idle, iowait = rng.randrange(10**7), rng.randrange(10**5)
+    irq, softirq = rng.randrange(10**4), rng.randrange(10**4)
+    return f"{name} {user} {nice} {system} {idle} {iowait} {irq} {softirq} 0 0 0\n"
+
+
+def _pid_stat(pid, ppid, name, rng):
+    fields = ["S", str(ppid)] + ["0"] * 9
+    fields += [str(rng.randrange(10**5)), str(rng.randrange(10**5))]  # utime, stime
+    fields += ["0"] * 6
+    fields += [str(rng.randrange(10**6))]  # starttime
+    fields += [str(rng.randrange(10**9)), str(rng.randrange(10**5))]  # vsize, rss
+    fields += ["0"] * 25
+    return f"{pid} ({name}) {' '.join(fields)}\n"
+
+
+def generate(root, cpus=8, pids=100, ifaces=4, disks=4, seed=0, cluster_size=4):
+    """
+    Write a synthetic /proc and /sys under `root` with the given number of
+    CPUs, processes, network interfaces and block devices (each disk also
+    gets two partitions). CPUs share cpufreq policies in clusters of
+    `cluster_size` (0: per-core cpufreq only, as on older kernels).
+    """
+    rng = random.Random(seed)
+    proc = os.path.join(root, "proc")
+    sys_ = os.path.join(root, "sys")
+
+    stat = _cpu_line("cpu", rng) + "".join(_cpu_line(f"cpu{i}", rng) for i in range(cpus))
+    stat += "intr 0\nctxt 0\nbtime 0\nprocesses 0\nprocs_running 1\nprocs_blocked 0\n"
+    _write(os.path.join(proc, "stat"), stat)
+
+    _write(os.path.join(proc, "meminfo"), "".join(
+        f"{k}:{v:>16} kB\n" for k, v in [
+            ("MemTotal", 7_800_000), ("MemFree", 900_000), ("MemAvailable", 3_100_000),
+            ("Buffers", 12_000), ("Cached", 2_000_000), ("SwapCached", 1_000),
+            ("Active", 3_000_000), ("Inactive", 2_000_000), ("SwapTotal", 4_000_000),
+            ("SwapFree", 3_500_000), ("Dirty", 100), ("Shmem", 50_000),
+        ]
+    ))
+    _write(os.path.join(proc, "loadavg"), f"1.20 0.90 0.70 2/{pids} {pids}\n")
+    _write(os.path.join(proc, "uptime"), "12345.67 40000.00\n")
+
+    net = ("Inter-|   Receive                                                |  Transmit\n"
+           " face |bytes    packets errs drop fifo frame compressed multicast|"
+           "bytes    packets errs drop fifo colls carrier compressed\n")
+    net += "    lo: 1000 10 0 0 0 0 0 0 1000 10 0 0 0 0 0 0\n"
+    for i in range(ifaces):
+        name = f"wlan{i}"
+        rx, tx = rng.randrange(10**10), rng.randrange(10**9)
+        net += f"{name:>6}: {rx} {rx // 1400} 0 0 0 0 0 0 {tx} {tx // 1400} 0 0 0 0 0 0\n"
+        _write(os.path.join(sys_, "class", "net", name, "operstate"), "up\n")
+    _write(os.path.join(proc, "net", "dev"), net)
+
+    diskstats = ""
+    for i in range(disks):
+        disk = f"mmcblk{i}"
+        os.makedirs(os.path.join(sys_, "block", disk), exist_ok=True)
+        for name in (disk, f"{disk}p1", f"{disk}p2"):
+            f = [rng.randrange(10**6) for _ in range(11)]
+            diskstats += f" 179 {i * 8} {name} " + " ".join(map(str, f)) + " 0 0 0 0\n"
+    diskstats += "   7 0 loop0 0 0 0 0 0 0 0 0 0 0 0\n"
+    _write(os.path.join(proc, "diskstats"), diskstats)
+
+    names = ["system_server", "surfaceflinger", "com.android.chrome", "python", "kworker/0:1"]
+    for pid in range(1, pids + 1):
+        _write(os.path.join(proc, str(pid), "stat"),
+               _pid_stat(pid, max(1, pid // 4), rng.choice(names), rng))
+
+    cpu_base = os.path.join(sys_, "devices", "system", "cpu")
+    for i in range(cpus):
+        cpu = os.path.join(cpu_base, f"cpu{i}")
+        _write(os.path.join(cpu, "cpufreq", "scaling_cur_freq"), f"{rng.randrange(300, 3000) * 1000}\n")
+        _write(os.path.join(cpu, "cpufreq", "cpuinfo_max_freq"), "3000000\n")
+        for s in range(3):
+            _write(os.path.join(cpu, "cpuidle", f"state{s}", "time"), f"{rng.randrange(10**9)}\n")
+
+    for first in range(0, cpus if cluster_size else 0, cluster_size or 1):
+        policy = os.path.join(cpu_base, "cpufreq", f"policy{first}")
+        members = range(first, min(cpus, first + cluster_size))
+        max_khz = 1800000 + 600000 * (first // cluster_size)
+        _write(os.path.join(policy, "related_cpus"), " ".join(map(str, members)) + "\n")
+        _write(os.path.join(policy, "cpuinfo_max_freq"), f"{max_khz}\n")
+        _write(os.path.join(policy, "scaling_max_freq"), f"{max_khz}\n")
+        _write(os.path.join(policy, "scaling_cur_freq"), f"{rng.randrange(300, max_khz // 1000) * 1000}\n")
+
+    for z in range(6):
+        zone = os.path.join(sys_, "class", "thermal", f"thermal_zone{z}")
+        _write(os.path.join(zone, "temp"), f"{rng.randrange(30000, 70000)}\n")
+        _write(os.path.join(zone, "type"), f"zone{z}-therm\n")
+
+    return root
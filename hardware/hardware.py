@@ -1,19 +1,78 @@
 # hardware.py - Enhanced version with disk I/O and swap support + improved CPU usage sources
 
 import os
-import subprocess
-import json
+import re
 import time
 
 from utils.utils import get_state
+from utils import procfs
+from utils import scheduler
+from utils.termux import query_json
+from utils.scheduler import register_output, register_source
+
+
+# The aggregate "cpu ..." line and the "cpuN user nice system idle ..." lines of /proc/stat
+_PROC_STAT_CPU = re.compile(rb"^(cpu\d*) +([\d ]+)$", re.M)
+# "Key:   value kB" lines of /proc/meminfo
+_MEMINFO_LINE = re.compile(rb"^([^:\n]+):\s+(\d+)", re.M)
+# "major minor name fields..." lines of /proc/diskstats
+_DISKSTATS_LINE = re.compile(rb"^ *\d+ +\d+ (\S+) ([\d ]+)$", re.M)
+
+# cpuidle state time files per CPU, listed once
+_cpuidle_files = {}
+# thermal zone type names never change; read once per zone
+_thermal_types = {}
+# Whole disks from /sys/block: name -> True if stacked on other disks (dm, md)
+_block_devices = {"names": {}, "time": None, "base": None}
+# Rescan /sys/block this often to pick up hotplugged devices
+_BLOCK_RESCAN = 30.0
+# cpufreq policies (cores sharing one clock), listed once per root
+_cpufreq_policies = {"base": None, "policies": []}
+
+# Cluster names by rank of maximum frequency, for up to 3 distinct maxima
+CLUSTER_LABELS = {1: ("all",), 2: ("little", "big"), 3: ("little", "big", "prime")}
+# A capped cluster counts as thermally throttled when the hottest zone has
+# risen this much (°C) within the last TEMP_WINDOW seconds
+TEMP_RISE = 2.0
+TEMP_WINDOW = 30.0
+
+
+# CPU time categories reported from /proc/stat, in stacking order; the
+# remainder is idle. user includes nice; guest time is already counted
+# inside user/nice by the kernel.
+CPU_TIMES = ("user", "system", "irq", "softirq", "steal", "iowait")
 
 
 def _read_int(path):
-    try:
-        with open(path) as f:
-            return int(f.read().strip())
-    except Exception:
+    return procfs.read_int(path)
+
+
+def _stat_times(raw):
+    """Counters in CPU_TIMES order, then idle, from the fields of a cpu line."""
+    f = [int(x) for x in raw.split()[:8]]
+    f.extend([0] * (8 - len(f)))
+    user, nice, system, idle, iowait, irq, softirq, steal = f
+    return (user + nice, system, irq, softirq, steal, iowait, idle)
+
+
+def _time_breakdown(prev, cur):
+    """
+    Share of elapsed time per category between two _stat_times() tuples,
+    as {category: percent, ..., "idle": percent}, or None if no time passed.
+    """
+    # Some counters (iowait in particular) may go backwards; clamp to zero
+    deltas = [max(0, c - p) for c, p in zip(cur, prev)]
+    total = sum(deltas)
+    if total <= 0:
         return None
+    times = {name: 100.0 * d / total for name, d in zip(CPU_TIMES, deltas)}
+    times["idle"] = 100.0 * deltas[-1] / total
+    return times
+
+
+def _busy(times):
+    """Busy percent from a breakdown: iowait is waiting, not computing."""
+    return max(0.0, min(100.0, 100.0 - times["idle"] - times["iowait"]))
 
 
 def _cpufreq_info(cpu_path):
@@ -23,6 +82,63 @@ def _cpufreq_info(cpu_path):
     return cur, max_f
 
 
+def _cpu_list(text):
+    """CPU numbers from a sysfs list such as "0 1 2 3" or "0-3,6"."""
+    cpus = []
+    for part in text.replace(",", " ").split():
+        lo, _, hi = part.partition("-")
+        if lo.isdigit() and (not hi or hi.isdigit()):
+            cpus.extend(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+
+def _policies():
+    """
+    cpufreq policies from /sys/devices/system/cpu/cpufreq/policy*, ordered
+    by first CPU: {name, path, cpus (related_cpus), max (cpuinfo_max_freq,
+    kHz)}. Empty on kernels without policy directories.
+    """
+    base = procfs.sys_path("devices/system/cpu/cpufreq/")
+    if _cpufreq_policies["base"] == base:
+        return _cpufreq_policies["policies"]
+    policies = []
+    try:
+        names = [n for n in os.listdir(base) if n.startswith("policy") and n[6:].isdigit()]
+    except OSError:
+        names = []
+    for name in names:
+        path = os.path.join(base, name)
+        try:
+            with open(os.path.join(path, "related_cpus")) as f:
+                cpus = _cpu_list(f.read())
+            with open(os.path.join(path, "cpuinfo_max_freq")) as f:
+                max_khz = int(f.read())
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            policies.append({"name": name, "path": path, "cpus": cpus, "max": max_khz})
+    policies.sort(key=lambda p: p["cpus"][0])
+    _cpufreq_policies.update({"base": base, "policies": policies})
+    return policies
+
+
+def _policy_freqs():
+    """
+    CPU number -> (cur_khz, max_khz, limit_khz, policy name), reading
+    scaling_cur_freq and scaling_max_freq once per policy rather than
+    once per core.
+    """
+    freqs = {}
+    for policy in _policies():
+        path = policy["path"]
+        cur = _read_int(os.path.join(path, "scaling_cur_freq"))
+        limit = _read_int(os.path.join(path, "scaling_max_freq"))
+        entry = (cur, policy["max"], limit, policy["name"])
+        for n in policy["cpus"]:
+            freqs[n] = entry
+    return freqs
+
+
 def _cpuidle_total_time(cpu_path):
     """
     Sum cpuidle time counters for one CPU.
@@ -33,24 +149,26 @@ def _cpuidle_total_time(cpu_path):
     Units vary (often microseconds; sometimes nanoseconds).
     Returns int summed time as reported by sysfs, or None if not available.
     """
-    base = os.path.join(cpu_path, "cpuidle")
-    try:
-        if not os.path.isdir(base):
-            return None
-        total = 0
-        any_state = False
-        for name in os.listdir(base):
-            if not name.startswith("state"):
-                continue
-            any_state = True
-            t = _read_int(os.path.join(base, name, "time"))
-            if t is not None:
-                total += t
-        if not any_state:
-            return None
-        return total if total > 0 else None
-    except Exception:
+    files = _cpuidle_files.get(cpu_path)
+    if files is None:
+        base = os.path.join(cpu_path, "cpuidle")
+        try:
+            files = [
+                os.path.join(base, name, "time")
+                for name in sorted(os.listdir(base))
+                if name.startswith("state")
+            ]
+        except Exception:
+            files = []
+        _cpuidle_files[cpu_path] = files
+    if not files:
         return None
+    total = 0
+    for path in files:
+        t = _read_int(path)
+        if t is not None:
+            total += t
+    return total if total > 0 else None
 
 
 def _usage_from_cpuidle(cpu_id, idle_now, now_s, cpu_state):
@@ -100,61 +218,74 @@ def _usage_from_cpuidle(cpu_id, idle_now, now_s, cpu_state):
     return max(0.0, min(100.0, usage))
 
 
+@register_source("cpu", 0.5)
 def get_cpu_data():
     """
     CPU monitoring with multiple methods:
       1) /proc/stat deltas (best; true busy%) if accessible
       2) cpuidle time deltas (good estimate; works on some restricted setups)
       3) cpufreq ratio (proxy only; indicates how hard the governor is pushing)
+
+    Frequencies are read once per cpufreq policy; cores in one report its
+    name as "cluster" and its scaling_max_freq cap as "limit" (MHz).
+
+    The aggregate "cpu" line is parsed in the same pass and published as
+    the "cpu_total" output.
     """
     cores = []
-    base = "/sys/devices/system/cpu/"
+    base = procfs.sys_path("devices/system/cpu/")
     cpu_state = get_state()["cpu"]
 
-    # List CPUs from sysfs
+    # List CPUs from sysfs, numerically (cpu2 before cpu10)
     try:
         cpu_dirs = sorted(
-            [d for d in os.listdir(base) if d.startswith("cpu") and d[3:].isdigit()]
+            (d for d in os.listdir(base) if d.startswith("cpu") and d[3:].isdigit()),
+            key=lambda d: int(d[3:]),
         )
     except Exception:
         cpu_dirs = []
 
-    # 1) /proc/stat per-cpu usage (delta-based)
+    # 1) /proc/stat per-cpu usage and time breakdown (delta-based)
     proc_usage = {}
+    proc_times = {}
     try:
-        with open("/proc/stat") as f:
-            for line in f:
-                if line.startswith("cpu") and not line.startswith("cpu "):
-                    parts = line.split()
-                    cpu_id = parts[0]  # e.g. "cpu0"
-                    fields = [int(x) for x in parts[1:]]
-                    total = sum(fields)
-                    idle = fields[3] if len(fields) > 3 else 0
-
-                    key_t = f"{cpu_id}_total"
-                    key_i = f"{cpu_id}_idle"
-
-                    if key_t in cpu_state and key_i in cpu_state:
-                        total_delta = total - cpu_state[key_t]
-                        idle_delta = idle - cpu_state[key_i]
-                        usage = (
-                            100.0 * (1.0 - idle_delta / total_delta)
-                            if total_delta > 0
-                            else 0.0
-                        )
-                        proc_usage[cpu_id] = max(0.0, min(100.0, usage))
-
-                    cpu_state[key_t] = total
-                    cpu_state[key_i] = idle
+        data = procfs.read_bytes(procfs.proc_path("stat"))
+        if data is not None:
+            for m in _PROC_STAT_CPU.finditer(data):
+                cpu_id = m.group(1).decode()  # e.g. "cpu0", or "cpu" for the total
+                cur = _stat_times(m.group(2))
+
+                key = f"{cpu_id}_times"
+                prev = cpu_state.get(key)
+                cpu_state[key] = cur
+                if prev is None:
+                    continue
+
+                times = _time_breakdown(prev, cur)
+                if cpu_id == "cpu":
+                    if times is not None:
+                        scheduler.publish("cpu_total", {"usage": _busy(times), "times": times})
+                    continue
+                if times is None:
+                    proc_usage[cpu_id] = 0.0
+                else:
+                    proc_usage[cpu_id] = _busy(times)
+                    proc_times[cpu_id] = times
     except Exception:
         proc_usage = {}
+        proc_times = {}
 
     now_s = time.monotonic()
+    freqs = _policy_freqs()
 
     for cpu in cpu_dirs:
         cpu_path = os.path.join(base, cpu)
 
-        cur_khz, max_khz = _cpufreq_info(cpu_path)
+        policy = freqs.get(int(cpu[3:]))
+        if policy is not None:
+            cur_khz, max_khz, limit_khz, cluster = policy
+        else:
+            cur_khz, max_khz = _cpufreq_info(cpu_path)
         cur_mhz = (cur_khz // 1000) if cur_khz else 0
         max_mhz = (max_khz // 1000) if max_khz else 0
 
@@ -183,34 +314,47 @@ def get_cpu_data():
                 usage = 0.0
                 usage_src = "unknown"
 
-        cores.append(
-            {
-                "id": cpu,
-                "cur": cur_mhz,
-                "max": max_mhz,
-                "usage": float(usage),
-                "usage_src": usage_src,
-            }
-        )
+        core = {
+            "id": cpu,
+            "cur": cur_mhz,
+            "max": max_mhz,
+            "usage": float(usage),
+            "usage_src": usage_src,
+        }
+        if usage_src == "procstat" and cpu in proc_times:
+            core["times"] = proc_times[cpu]
+        if policy is not None:
+            core["cluster"] = cluster
+            core["limit"] = (limit_khz // 1000) if limit_khz else max_mhz
+        cores.append(core)
 
     return cores
 
 
+# Whole-system CPU, {"usage": busy %, "times": CPU_TIMES and idle shares}
+# from the aggregate /proc/stat line. Published by get_cpu_data() from the
+# same read as the per-core lines, so it is stamped with every "cpu" sample;
+# None until two samples exist or if /proc/stat is hidden.
+register_output("cpu_total")
+
+
+@register_source("temps", 2.0)
 def get_temps():
-    """Read SoC temperature zones."""
+    """Read SoC temperature zones: [{"name": type, "zone": N, "temp": °C}]."""
     temps = []
     try:
-        thermal_path = "/sys/class/thermal/"
+        thermal_path = procfs.sys_path("class/thermal/")
         zones = sorted([z for z in os.listdir(thermal_path) if z.startswith("thermal_zone")])
         for zone in zones[:4]:  # Limit to first 4
             try:
-                with open(f"{thermal_path}{zone}/temp") as f:
-                    temp = int(f.read().strip()) / 1000
-                with open(f"{thermal_path}{zone}/type") as f:
-                    name = f.read().strip()
+                temp = _read_int(f"{thermal_path}{zone}/temp") / 1000
+                name = _thermal_types.get(zone)
+                if name is None:
+                    with open(f"{thermal_path}{zone}/type") as f:
+                        name = _thermal_types[zone] = f.read().strip()
                 # Only add if temperature is reasonable (not 0 or error values)
                 if 0 < temp < 150:
-                    temps.append({"name": name, "temp": temp})
+                    temps.append({"name": name, "zone": int(zone[12:]), "temp": temp})
             except Exception:
                 continue
     except Exception:
@@ -218,30 +362,114 @@ def get_temps():
     return temps
 
 
+def _temp_rise(temps):
+    """
+    How much (°C) the hottest zone rose over the last TEMP_WINDOW seconds,
+    from samples kept as the temps source produces them.
+    """
+    state = get_state()["clusters"]
+    stamp = scheduler.get_sample_time("temps")
+    if temps and stamp is not None and stamp != state["stamp"]:
+        state["stamp"] = stamp
+        samples = state["temps"]
+        samples.append((stamp, max(t["temp"] for t in temps)))
+        while samples and samples[0][0] < stamp - TEMP_WINDOW:
+            samples.popleft()
+    samples = state["temps"]
+    if not samples:
+        return None, 0.0
+    hottest = samples[-1][1]
+    return hottest, hottest - min(temp for _, temp in samples)
+
+
+@register_source("clusters", 1.0)
+def get_cpu_clusters():
+    """
+    Cores grouped by cpufreq policy (big.LITTLE clusters), with throttling.
+
+    Built from the latest cpu and temps samples, so nothing is read from
+    /sys. A cluster is "capped" while scaling_max_freq is below
+    cpuinfo_max_freq, and "throttled" when the cap appeared or was
+    lowered within the last TEMP_WINDOW seconds while the hottest thermal
+    zone rose by TEMP_RISE or more over them; it stays throttled until
+    the cap is lifted. A cap that was already in place (a powersave
+    profile, a user-set limit) is never flagged just because the device
+    warms up. None without cpufreq policies.
+    """
+    cores = scheduler.get_latest("cpu") or []
+    groups = {}
+    for core in cores:
+        if core.get("cluster"):
+            groups.setdefault(core["cluster"], []).append(core)
+    if not groups:
+        return None
+
+    hottest, rise = _temp_rise(scheduler.get_latest("temps"))
+    state = get_state()["clusters"]
+    throttled, limits, dropped = state["throttled"], state["limits"], state["dropped"]
+    now = time.monotonic()
+    ranks = sorted({members[0]["max"] for members in groups.values()})
+    labels = CLUSTER_LABELS.get(len(ranks))
+
+    clusters = []
+    for name, members in groups.items():
+        first = members[0]
+        limit = first["limit"]
+        capped = 0 < limit < first["max"]
+        # The first sample is the baseline; only later drops count
+        if name in limits and limit < limits[name]:
+            dropped[name] = now
+        limits[name] = limit
+        if not capped:
+            throttled.discard(name)
+            dropped.pop(name, None)
+        elif rise >= TEMP_RISE and now - dropped.get(name, -TEMP_WINDOW - 1) <= TEMP_WINDOW:
+            throttled.add(name)
+        clusters.append({
+            "name": name,
+            "label": labels[ranks.index(first["max"])] if labels else name,
+            "cpus": [c["id"] for c in members],
+            "cur": first["cur"],
+            "max": first["max"],
+            "limit": first["limit"],
+            "usage": sum(c["usage"] for c in members) / len(members),
+            "capped": capped,
+            "throttled": name in throttled,
+        })
+    return {"clusters": clusters, "temp": hottest, "rise": rise}
+
+
+@register_source("battery", 2.0)
 def get_battery():
-    """Uses Termux API if available."""
-    try:
-        result = subprocess.run(
-            ["termux-battery-status"], capture_output=True, text=True, timeout=1
-        )
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            return {
-                "level": data.get("percentage", 0),
-                "status": data.get("status", "Unknown"),
-                "temp": data.get("temperature", 0),
-                "health": data.get("health", "Unknown"),
-            }
-    except Exception:
-        pass
-    return None
+    """
+    Uses Termux API if available.
+
+    Never blocks: termux-battery-status runs in the background at most
+    every 30 s and the last good reading is returned, flagged stale when
+    the refresh is failing or overdue.
+    """
+    result = query_json(["termux-battery-status"], max_age=30.0, timeout=5.0)
+    data = result["value"]
+    if not isinstance(data, dict):
+        return None
+    return {
+        "level": data.get("percentage", 0),
+        "status": data.get("status", "Unknown"),
+        "temp": data.get("temperature", 0),
+        "health": data.get("health", "Unknown"),
+        "age": result["age"],
+        "stale": result["stale"],
+    }
 
 
+@register_source("mem", 1.0)
 def get_mem():
     """Reads RAM usage from /proc/meminfo with swap support."""
     try:
-        with open("/proc/meminfo") as f:
-            m = {l.split(":")[0]: int(l.split()[1]) for l in f if ":" in l}
+        m = {
+            k.decode(): int(v)
+            for k, v in _MEMINFO_LINE.findall(procfs.read_bytes(procfs.proc_path("meminfo")))
+        }
 
         total = m["MemTotal"] / 1024
         avail = m.get("MemAvailable", m["MemFree"] + m.get("Cached", 0)) / 1024
@@ -273,6 +501,7 @@ def get_mem():
         return {"used": 0, "total": 1, "buffers": 0, "cached": 0, "percent": 0}
 
 
+@register_source("storage", 5.0)
 def get_storage():
     """Reads disk usage from the root filesystem."""
     try:
@@ -289,50 +518,116 @@ def get_storage():
         return {"used": 0, "total": 1, "percent": 0}
 
 
-def get_disk_io():
+def _whole_disks(now):
     """
-    Get disk I/O statistics from /proc/diskstats.
-    Returns read/write speeds in MB/s.
+    Whole block devices (as bytes names) from /sys/block, rescanned every
+    _BLOCK_RESCAN seconds. Partitions never appear there; loop and ram
+    devices are skipped. Values say whether the device is stacked on
+    others (device-mapper, md), whose I/O is already counted below it.
     """
-    try:
-        disk_state = get_state()["disk_io"]
+    cache = _block_devices
+    base = procfs.sys_path("block")
+    if cache["base"] != base or now - cache["time"] >= _BLOCK_RESCAN:
+        names = {}
+        try:
+            entries = os.listdir(base)
+        except OSError:
+            entries = []
+        for name in entries:
+            if name.startswith(("loop", "ram")):
+                continue
+            try:
+                stacked = bool(os.listdir(os.path.join(base, name, "slaves")))
+            except OSError:
+                stacked = False
+            names[name.encode()] = stacked
+        cache.update(names=names, time=now, base=base)
+    return cache["names"]
 
-        total_read = 0
-        total_write = 0
 
-        with open("/proc/diskstats") as f:
-            for line in f:
-                parts = line.split()
-                if len(parts) < 14:
-                    continue
-
-                device_name = parts[2]
-                if device_name.startswith("loop") or device_name.startswith("ram"):
-                    continue
+@register_source("disk_io", 1.0)
+def get_disk_io():
+    """
+    Per-device disk statistics from one parse of /proc/diskstats.
 
-                # Field meanings vary slightly by kernel docs, but the common layout:
-                # reads completed (3), reads merged (4), sectors read (5), ...
-                # writes completed (7), writes merged (8), sectors written (9), ...
-                read_sectors = int(parts[5])
-                write_sectors = int(parts[9])
+    Only whole disks listed in /sys/block are reported, so partitions are
+    not counted twice. For each device over the last interval: read/write
+    MB/s, IOPS, average request latency (ms spent / requests completed),
+    average queue depth and %util (share of time with I/O in flight).
+    Totals add up devices that are not stacked on other disks.
 
-                total_read += read_sectors * 512
-                total_write += write_sectors * 512
+    Returns None until two samples exist.
+    """
+    try:
+        disk_state = get_state()["disk_io"]
+        now = time.monotonic()
+        disks = _whole_disks(now)
 
-        now = time.time()
-        dt = now - disk_state.get("time", now)
+        counters = {}
+        for m in _DISKSTATS_LINE.finditer(procfs.read_bytes(procfs.proc_path("diskstats"))):
+            name = m.group(1)
+            if name not in disks:
+                continue
+            parts = m.group(2).split()
+            if len(parts) < 11:
+                continue
+            # Fields after the device name: reads completed (0), sectors
+            # read (2), ms reading (3), writes completed (4), sectors
+            # written (6), ms writing (7), in flight (8), ms doing I/O (9),
+            # weighted ms doing I/O (10)
+            counters[name.decode()] = (
+                int(parts[0]), int(parts[2]) * 512, int(parts[3]),
+                int(parts[4]), int(parts[6]) * 512, int(parts[7]),
+                int(parts[8]), int(parts[9]), int(parts[10]),
+                disks[name],
+            )
+
+        prev = disk_state["devices"]
+        dt = now - disk_state["time"] if disk_state["time"] is not None else 0.0
+        disk_state.update(devices=counters, time=now)
         if dt <= 0:
-            disk_state.update({"read": total_read, "write": total_write, "time": now})
             return None
 
-        read_speed = (total_read - disk_state.get("read", 0)) / dt / (1024**2)
-        write_speed = (total_write - disk_state.get("write", 0)) / dt / (1024**2)
-
-        disk_state.update({"read": total_read, "write": total_write, "time": now})
+        devices = {}
+        total_read = total_write = 0
+        read_speed = write_speed = 0.0
+        for name, cur in counters.items():
+            (reads, rbytes, rms, writes, wbytes, wms, inflight, io_ms, queue_ms, stacked) = cur
+            if not stacked:
+                total_read += rbytes
+                total_write += wbytes
+            old = prev.get(name)
+            if old is None:
+                continue
+            # Counters can reset (device re-added); clamp to zero
+            d_reads = max(0, reads - old[0])
+            d_writes = max(0, writes - old[3])
+            d_rbytes = max(0, rbytes - old[1])
+            d_wbytes = max(0, wbytes - old[4])
+            d_ms = max(0, rms - old[2]) + max(0, wms - old[5])
+            ios = d_reads + d_writes
+            dev = {
+                "read_speed": d_rbytes / dt / (1024**2),
+                "write_speed": d_wbytes / dt / (1024**2),
+                "read_iops": d_reads / dt,
+                "write_iops": d_writes / dt,
+                "latency_ms": d_ms / ios if ios else 0.0,
+                "queue": max(0, queue_ms - old[8]) / (dt * 1000),
+                "util": min(100.0, max(0, io_ms - old[7]) / (dt * 10)),
+                "inflight": inflight,
+            }
+            devices[name] = dev
+            if not stacked:
+                read_speed += dev["read_speed"]
+                write_speed += dev["write_speed"]
 
         return {
-            "read_speed": max(0.0, read_speed),
-            "write_speed": max(0.0, write_speed),
+            "read_speed": read_speed,
+            "write_speed": write_speed,
+            # Cumulative counters (bytes) for exporters
+            "read_bytes": total_read,
+            "write_bytes": total_write,
+            "devices": devices,
         }
     except Exception:
         return None
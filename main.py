@@ -1,28 +1,349 @@
 #!/usr/bin/env python3
 # main.py - Enhanced version with history tracking
+import argparse
+import sys
 import time
-from rich.live import Live
-from rich.console import Console
-from utils.system_info import check_dependencies
-from ui.ui import generate_layout
-from utils.utils import get_state, update_history
-from hardware.hardware import get_cpu_data, get_mem
+from utils.system_info import (
+    check_dependencies, set_process_grouping, set_thread_target, GROUP_MODES,
+)
+from utils.utils import get_state, update_history, set_history_depth
+from utils.history import DEFAULT_DEPTH
+from utils.snapshot import take_snapshot
+from utils import scheduler
+from utils import procfs
+from utils.recorder import Recorder, Player, DEFAULT_CAPACITY
+from utils.selfstat import mark_tick
+from utils import alerts
 
-console = Console()
+# Rich is imported lazily so headless modes never load it
+_console = None
 
-def update_sparkline_history():
-    """Update historical data for sparklines."""
+def get_console():
+    """Shared Rich console, created on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+# Sample time of the last value appended to history, per source
+_recorded = {}
+
+def _is_new_sample(snapshot, source):
+    """True once per collected sample, so slower sources are not repeated."""
+    stamp = snapshot.get('stamps', {}).get(source)
+    if stamp is not None and _recorded.get(source) == stamp:
+        return False
+    _recorded[source] = stamp
+    return True
+
+def update_sparkline_history(snapshot):
+    """Update historical data for sparklines from this tick's snapshot."""
     # Update memory history
-    mem = get_mem()
-    update_history('memory', mem['percent'])
+    if _is_new_sample(snapshot, 'mem'):
+        update_history('memory', snapshot['mem']['percent'])
     
     # Update CPU history for each core
-    cpus = get_cpu_data()
-    for i, cpu in enumerate(cpus):
-        update_history(f'cpu{i}', cpu['usage'])
+    if _is_new_sample(snapshot, 'cpu'):
+        for i, cpu in enumerate(snapshot['cpu']):
+            update_history(f'cpu{i}', cpu['usage'])
+    
+    # Update whole-system CPU history, total and per time category
+    if snapshot.get('cpu_total') and _is_new_sample(snapshot, 'cpu_total'):
+        total = snapshot['cpu_total']
+        update_history('cpu', total['usage'])
+        for name, pct in total['times'].items():
+            update_history(f'cpu_{name}', pct)
+    
+    # Update stall rates (PSI "some", % of time) per resource
+    if snapshot.get('pressure') and _is_new_sample(snapshot, 'pressure'):
+        for resource, lines in snapshot['pressure'].items():
+            update_history(f'psi_{resource}', lines['some']['rate'])
+    
+    # Update network throughput history (KB/s)
+    if _is_new_sample(snapshot, 'net'):
+        update_history('net_rx', snapshot['net']['rx_speed'])
+        update_history('net_tx', snapshot['net']['tx_speed'])
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Termux System Monitor")
+    parser.add_argument(
+        "--history", type=int, default=DEFAULT_DEPTH, metavar="N",
+        help=f"raw samples kept per metric (default: {DEFAULT_DEPTH})",
+    )
+    parser.add_argument(
+        "--record", metavar="FILE",
+        help="append every snapshot to a fixed-size binary ring file",
+    )
+    parser.add_argument(
+        "--record-samples", type=int, default=DEFAULT_CAPACITY, metavar="N",
+        help=f"ring capacity when creating a recording (default: {DEFAULT_CAPACITY})",
+    )
+    parser.add_argument(
+        "--replay", metavar="FILE",
+        help="play back a recording instead of sampling this device",
+    )
+    parser.add_argument(
+        "--speed", type=float, default=1.0, metavar="N",
+        help="replay speed multiplier (default: 1.0)",
+    )
+    parser.add_argument(
+        "--from", dest="start", type=float, default=0.0, metavar="SECONDS",
+        help="start replay this many seconds into the recording",
+    )
+    parser.add_argument(
+        "--jsonl", action="store_true",
+        help="write one JSON object per tick to stdout instead of the UI",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=1.0, metavar="SECONDS",
+        help="seconds between --jsonl lines or --agent updates (default: 1.0)",
+    )
+    parser.add_argument(
+        "--exporter", type=int, metavar="PORT",
+        help="serve Prometheus metrics on /metrics instead of the UI",
+    )
+    parser.add_argument(
+        "--bind", default="127.0.0.1", metavar="HOST",
+        help="address for --exporter and --agent to listen on (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--agent", metavar="ADDR",
+        help="stream delta-encoded snapshots on PORT, HOST:PORT or unix:PATH instead of the UI",
+    )
+    parser.add_argument(
+        "--dashboard", nargs="+", metavar="ADDR",
+        help="show every listed --agent in one condensed view",
+    )
+    parser.add_argument(
+        "--group", choices=GROUP_MODES,
+        help="collapse the process list by process tree, command name or user",
+    )
+    parser.add_argument(
+        "--expand", action="append", default=[], metavar="NAME",
+        help="with --group, also list the busiest members of group NAME (repeatable)",
+    )
+    parser.add_argument(
+        "--threads", type=int, metavar="PID",
+        help="show the threads of PID in place of the processes panel",
+    )
+    parser.add_argument(
+        "--adaptive", action="store_true",
+        help="tick faster when CPU/PSI jump, slower when stable, on low battery or in the background",
+    )
+    parser.add_argument(
+        "--lowbw", action="store_true",
+        help="repaint only changed lines (for slow SSH links); reports bytes/frame",
+    )
+    parser.add_argument(
+        "--alert", action="append", default=[], metavar="RULE",
+        help='alert rule, e.g. "cpu avg > 90%% for 30s" (repeatable; highlights the panel)',
+    )
+    parser.add_argument(
+        "--alerts", metavar="FILE",
+        help="read alert rules from FILE, one per line",
+    )
+    parser.add_argument(
+        "--alert-log", metavar="FILE",
+        help="append alert FIRING/RESOLVED transitions to FILE",
+    )
+    parser.add_argument(
+        "--alert-cmd", metavar="CMD",
+        help="run CMD on every alert transition (TSM_ALERT, TSM_ALERT_STATE, TSM_ALERT_VALUE set)",
+    )
+    parser.add_argument(
+        "--root", metavar="DIR",
+        help="read DIR/proc and DIR/sys instead of the live system",
+    )
+    return parser.parse_args(argv)
+
+def run_live(args, history):
+    """Sample this device and render until interrupted."""
+    from rich.live import Live
+    from ui.ui import generate_layout, get_shown_panels
+    from ui.diffrender import DiffRenderer
+    from utils import adaptive
+    
+    def render(snapshot):
+        layout = generate_layout(history, snapshot)
+        # Recordings keep every source; otherwise stop sampling what is not shown
+        if not recorder:
+            adaptive.set_shown_panels(get_shown_panels())
+        return layout
+    
+    recorder = Recorder(args.record, args.record_samples) if args.record else None
+    try:
+        # Collectors run in the background at their own cadence;
+        # rendering only reads the latest cached values
+        scheduler.start()
+        snapshot = take_snapshot()
+        update_sparkline_history(snapshot)
+        if recorder:
+            recorder.append(snapshot)
+        
+        first = render(snapshot)
+        if args.lowbw:
+            # Repaint only changed lines; bytes per frame show in the footer
+            display = DiffRenderer(first, color_system=get_console().color_system or "auto")
+        elif args.adaptive:
+            # Redraw only on our own ticks, which may be seconds apart
+            display = Live(first, auto_refresh=False, screen=True)
+        else:
+            display = Live(first, refresh_per_second=2, screen=True)
+        interval = adaptive.BASE_INTERVAL
+        with display as live:
+            while True:
+                time.sleep(interval)
+                mark_tick(interval)
+                
+                # Latest sample of every source, shared by history and panels
+                snapshot = take_snapshot()
+                update_sparkline_history(snapshot)
+                if recorder:
+                    recorder.append(snapshot)
+                
+                visible = adaptive.terminal_visible()
+                if args.adaptive:
+                    interval = adaptive.next_interval(snapshot, visible)
+                
+                # Regenerate layout with updated history
+                if visible:
+                    live.update(render(snapshot), refresh=True)
+                elif not recorder:
+                    # Nothing is drawn while in the background
+                    adaptive.set_shown_panels(())
+    finally:
+        scheduler.stop()
+        if recorder:
+            recorder.close()
+
+def run_replay(args, history):
+    """Feed recorded snapshots back through the same panels."""
+    from rich.live import Live
+    from ui.ui import generate_layout
+    
+    console = get_console()
+    player = Player(args.replay)
+    live = None
+    try:
+        if not len(player):
+            console.print(f"[yellow]{args.replay}: recording is empty[/yellow]")
+            return
+        speed = args.speed if args.speed > 0 else 1.0
+        first_wall, _ = player.record(0)
+        
+        prev_wall = None
+        for i in range(len(player)):
+            wall, snapshot = player.record(i)
+            update_sparkline_history(snapshot)
+            # Records before --from only warm up history
+            if wall - first_wall < args.start:
+                continue
+            if live is None:
+                live = Live(generate_layout(history, snapshot), refresh_per_second=2, screen=True)
+                live.start()
+            else:
+                # Cap gaps (monitor stopped, device asleep) to keep playback moving
+                time.sleep(min(wall - prev_wall, 5.0) / speed)
+                live.update(generate_layout(history, snapshot))
+            prev_wall = wall
+        
+        # Hold the last frame until interrupted
+        while live is not None:
+            time.sleep(0.5)
+    finally:
+        if live is not None:
+            live.stop()
+        player.close()
+
+def run_dashboard(args):
+    """Follow every agent and draw them side by side until interrupted."""
+    from rich.live import Live
+    from ui.dashboard import generate_dashboard
+    from utils.agent import follow_agents
+    
+    console = get_console()
+    devices = follow_agents(args.dashboard)
+    with Live(generate_dashboard(devices, console.width), auto_refresh=False, screen=True) as live:
+        while True:
+            time.sleep(0.5)
+            live.update(generate_dashboard(devices, console.width), refresh=True)
 
 def main():
     """Main entry point for the system monitor."""
+    args = parse_args()
+    set_history_depth(args.history)
+    if args.root:
+        procfs.set_root(args.root)
+    set_process_grouping(args.group, args.expand)
+    set_thread_target(args.threads)
+    try:
+        rules = list(args.alert)
+        if args.alerts:
+            rules += alerts.load_rules(args.alerts)
+        alerts.set_rules(rules, args.alert_log, args.alert_cmd)
+    except (OSError, ValueError) as e:
+        sys.exit(f"error: {e}")
+    
+    if args.jsonl:
+        from utils.jsonl import run_jsonl
+        for w in check_dependencies():
+            print(f"warning: {w}", file=sys.stderr)
+        try:
+            run_jsonl(max(0.01, args.interval))
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    if args.exporter is not None:
+        from utils.exporter import start_exporter
+        for w in check_dependencies():
+            print(f"warning: {w}", file=sys.stderr)
+        scheduler.start()
+        server = start_exporter(args.exporter, args.bind)
+        host, port = server.server_address[:2]
+        print(f"Serving metrics on http://{host}:{port}/metrics", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            scheduler.stop()
+        return
+    
+    if args.agent is not None:
+        from utils.agent import start_agent
+        for w in check_dependencies():
+            print(f"warning: {w}", file=sys.stderr)
+        scheduler.start()
+        server = start_agent(args.agent, max(0.1, args.interval), args.bind)
+        address = server.server_address
+        if isinstance(address, tuple):
+            address = "%s:%s" % address[:2]
+        print(f"Streaming snapshots on {address}", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            scheduler.stop()
+        return
+    
+    if args.dashboard:
+        # Remote devices only; local dependency warnings do not apply
+        try:
+            run_dashboard(args)
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    console = get_console()
+    
     # Check dependencies on startup
     warnings = check_dependencies()
     if warnings:
@@ -37,15 +358,10 @@ def main():
         state = get_state()
         history = state.get("history", {})
         
-        with Live(generate_layout(history), refresh_per_second=2, screen=True) as live:
-            while True:
-                time.sleep(0.5)
-                
-                # Update sparkline history
-                update_sparkline_history()
-                
-                # Regenerate layout with updated history
-                live.update(generate_layout(history))
+        if args.replay:
+            run_replay(args, history)
+        else:
+            run_live(args, history)
     
     except KeyboardInterrupt:
         console.print("\n[green]✓[/green] Exiting gracefully...")
@@ -0,0 +1,68 @@
+# test_agent.py - Agents on loopback followed by a dashboard, and the delta encoding
+
+import os
+import tempfile
+import time
+
+from utils.agent import apply, diff, follow_agents, start_agent
+
+
+def _wait_for(devices, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(d["snapshot"] is not None for d in devices):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_follow_tcp_and_unix_agents():
+    tcp = start_agent("0", interval=0.1)
+    port = tcp.server_address[1]
+    path = os.path.join(tempfile.mkdtemp(), "agent.sock")
+    unix = start_agent(f"unix:{path}", interval=0.1)
+    try:
+        devices = follow_agents([f"127.0.0.1:{port}", f"unix:{path}"])
+        assert _wait_for(devices), [d["error"] for d in devices]
+        for device in devices:
+            snap = device["snapshot"]
+            assert device["error"] is None
+            assert {"info", "cpu", "mem", "net"} <= snap.keys()
+            assert snap["mem"]["total"] > 0
+    finally:
+        for server in (tcp, unix):
+            server.shutdown()
+            server.server_close()
+        os.unlink(path)
+
+
+def test_diff_apply_round_trip():
+    old = {
+        "cpu": [{"usage": 1.0, "cur": 800}, {"usage": 2.0, "cur": 900}],
+        "mem": {"used": 100, "total": 400, "swap_total": 50},
+        "temps": [{"name": "a", "temp": 40.0}, {"name": "b", "temp": 41.0}],
+        "net": {"rx_speed": 0.0, "tx_speed": 0.0},
+        "battery": None,
+    }
+    new = {
+        "cpu": [{"usage": 5.0, "cur": 800}, {"usage": 2.0, "cur": 1800, "limit": 2000}],
+        "mem": {"used": 150, "total": 400},
+        "temps": [{"name": "a", "temp": 42.0}],
+        "net": {"rx_speed": 0.0, "tx_speed": 0.0},
+        "battery": {"level": 80},
+        "alerts": [],
+    }
+    delta = diff(old, new)
+    assert "net" not in delta
+    assert delta["mem"]["-"] == ["swap_total"]
+    assert "@" in delta["cpu"]
+    assert apply(old, delta) == new
+    # The reverse direction exercises added keys and longer lists
+    assert apply(new, diff(new, old)) == old
+    # Applying never mutates the base
+    assert old["mem"]["swap_total"] == 50
+
+
+def test_diff_from_empty_is_full_state():
+    state = {"cpu": [1, 2], "mem": {"used": 1}}
+    assert apply({}, diff({}, state)) == state
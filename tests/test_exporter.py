@@ -0,0 +1,57 @@
+# test_exporter.py - Scrape /metrics from a live exporter over loopback
+
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils.exporter import CONTENT_TYPE, render_metrics, start_exporter
+from utils.snapshot import snapshot_defaults
+
+# name{labels} value, or name value
+_SAMPLE = re.compile(r'^[a-z_:][a-z0-9_:]*(\{[^}]*\})? \S+$')
+
+
+@pytest.fixture
+def exporter():
+    server = start_exporter(0)
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_scrape_metrics(exporter):
+    with urllib.request.urlopen(f"{exporter}/metrics", timeout=10) as resp:
+        assert resp.status == 200
+        assert resp.headers["Content-Type"] == CONTENT_TYPE
+        body = resp.read().decode()
+
+    lines = [line for line in body.splitlines() if line and not line.startswith("#")]
+    assert lines
+    for line in lines:
+        assert _SAMPLE.match(line), line
+    # Every sample belongs to a family announced with # TYPE
+    families = set(re.findall(r"^# TYPE (\S+) ", body, re.M))
+    assert {line.split("{")[0].split(" ")[0] for line in lines} <= families
+
+
+def test_unknown_path_is_404(exporter):
+    with pytest.raises(urllib.error.HTTPError) as err:
+        urllib.request.urlopen(f"{exporter}/other", timeout=10)
+    assert err.value.code == 404
+
+
+def test_zones_sharing_a_type_stay_distinct():
+    snapshot = snapshot_defaults()
+    snapshot.update(info={}, monitor=None, stamps={}, temps=[
+        {"name": "cpu-therm", "zone": 0, "temp": 41.0},
+        {"name": "cpu-therm", "zone": 3, "temp": 45.5},
+    ])
+    body = render_metrics(snapshot).decode()
+    series = re.findall(r"^tsm_temperature_celsius(\{[^}]*\})", body, re.M)
+    assert len(series) == 2
+    assert len(set(series)) == 2
+    assert 'tsm_temperature_celsius{type="cpu-therm",zone="0"} 41' in body
+    assert 'tsm_temperature_celsius{type="cpu-therm",zone="3"} 45.5' in body
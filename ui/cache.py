@@ -0,0 +1,70 @@
+# cache.py - Reuse panels (and their rendered lines) while their inputs are unchanged
+
+import time
+
+from rich.segment import Segment
+
+from utils.selfstat import record_panel
+from utils.ui import add_omission, get_omissions
+
+# panel name -> (key, renderable, omissions added while building it)
+_panels = {}
+
+
+class CachedRender:
+    """
+    Wraps a panel and keeps the lines Rich rendered for it at the last size.
+
+    Layout renders every region on every refresh; while the same wrapper is
+    reused, regions whose size did not change replay their lines instead of
+    laying out the Table/Panel again.
+
+    Rich's layout is where a panel's real cost lies, so each miss is timed
+    and recorded as that panel's render time (see selfstat.record_panel).
+    """
+
+    def __init__(self, renderable, name):
+        self.renderable = renderable
+        self.name = name
+        self._size = None
+        self._lines = None
+
+    def __rich_console__(self, console, options):
+        size = (options.max_width, options.height)
+        if self._size != size:
+            start = time.perf_counter()
+            self._lines = console.render_lines(self.renderable, options)
+            record_panel(self.name, time.perf_counter() - start)
+            self._size = size
+        new_line = Segment.line()
+        for line in self._lines:
+            yield from line
+            yield new_line
+
+
+def cached_panel(name, key, build):
+    """
+    Panel `name` for inputs `key`, built by `build()` only when `key`
+    differs from the last call.
+
+    Keys are compared with ==, so unchanged sample objects short-circuit on
+    identity. Omissions recorded while building are replayed on a hit so
+    the footer stays accurate.
+    """
+    hit = _panels.get(name)
+    if hit is not None and hit[0] == key:
+        for item in hit[2]:
+            add_omission(item)
+        return hit[1]
+
+    before = len(get_omissions())
+    panel = build()
+    if panel is not None:
+        panel = CachedRender(panel, name)
+    _panels[name] = (key, panel, list(get_omissions()[before:]))
+    return panel
+
+
+def clear():
+    """Forget every cached panel."""
+    _panels.clear()
@@ -0,0 +1,80 @@
+# dashboard.py - Condensed multi-device view for --dashboard
+
+import time
+
+from rich.console import Group
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+from utils.snapshot import snapshot_defaults
+from utils.ui import reset_omissions
+
+from ui.panels.cpu import create_cpu_panel
+from ui.panels.network import create_network_panel
+from ui.panels.resources import create_resources_panel
+from ui.panels.sensors import create_sensors_panel
+
+# Narrowest column a device is drawn in
+DEVICE_WIDTH = 42
+# A connected agent that has been silent this long is shown as stale
+STALE_AFTER = 5.0
+
+
+def _device_panel(device, width):
+    """The minimal layout of one device, titled with its address and link state."""
+    snap = device["snapshot"]
+    sizes = list(device["bytes"])
+    rate = f"{sum(sizes) / len(sizes) / 1024:.1f}K/tick" if sizes else ""
+    if device["error"]:
+        status, style = f"[red]{device['error']}[/red]", "red"
+    elif device["time"] is None or time.monotonic() - device["time"] > STALE_AFTER:
+        status, style = "[yellow]waiting[/yellow]", "yellow"
+    elif snap and snap.get("alerts"):
+        status, style = f"[bold red]⚠ {snap['alerts'][0]['rule']}[/bold red]", "red"
+    else:
+        status, style = f"[dim]{rate}[/dim]", "blue"
+
+    title = f"[bold]{device['address']}[/bold]"
+    if snap is None:
+        return Panel(Text("no data yet", style="dim"), title=title, subtitle=status,
+                     border_style=style, width=width)
+
+    snapshot = snapshot_defaults()
+    snapshot.update({k: v for k, v in snap.items() if v is not None})
+    info = snap.get("info") or {}
+    if info.get("os"):
+        title += f" [dim]{info['os']}[/dim]"
+    inner = width - 4
+    parts = [
+        create_cpu_panel(snapshot, inner, "minimal"),
+        create_resources_panel(snapshot, inner, "minimal"),
+    ]
+    if snapshot["temps"] or snapshot["battery"]:
+        parts.append(create_sensors_panel(snapshot, inner, "minimal"))
+    parts.append(create_network_panel(snapshot, inner, "minimal"))
+    return Panel(Group(*parts), title=title, subtitle=status, border_style=style, width=width)
+
+
+def generate_dashboard(devices, width):
+    """Every device side by side, as many per row as fit in `width`."""
+    reset_omissions()
+    columns = max(1, min(len(devices), width // DEVICE_WIDTH))
+    cell = width // columns
+
+    grid = Table.grid(padding=0)
+    for _ in range(columns):
+        grid.add_column(width=cell)
+    panels = [_device_panel(device, cell) for device in devices]
+    for i in range(0, len(panels), columns):
+        grid.add_row(*panels[i:i + columns])
+
+    online = sum(1 for d in devices if d["snapshot"] is not None and not d["error"])
+    received = sum(sum(d["bytes"]) / max(1, len(d["bytes"])) for d in devices)
+    summary = Text.assemble(
+        ("📡 Dashboard  ", "bold cyan"),
+        (f"{online}/{len(devices)} online", "bold green" if online == len(devices) else "bold yellow"),
+        ("  •  ", "dim"),
+        (f"{received / 1024:.1f}K/tick in", "dim"),
+    )
+    return Group(summary, grid)
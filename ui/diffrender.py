@@ -0,0 +1,94 @@
+# diffrender.py - Low-bandwidth renderer: repaint only the lines that changed
+
+import sys
+
+from rich.console import Console
+
+from utils.utils import get_terminal_size
+from utils.selfstat import record_output
+
+_ENTER = "\x1b[?1049h\x1b[?25l\x1b[2J"  # alternate screen, hide cursor, clear
+_EXIT = "\x1b[?25h\x1b[?1049l"  # show cursor, leave alternate screen
+_CLEAR = "\x1b[2J"
+
+
+class DiffRenderer:
+    """
+    Drop-in alternative to rich.live.Live for slow links (e.g. SSH).
+
+    Each update renders the layout off-screen, compares it line by line
+    with the previous frame and writes only the lines that changed, each
+    prefixed by a cursor move. Bytes written per frame (and what a full
+    repaint would have cost) are reported through selfstat.
+    """
+
+    def __init__(self, renderable=None, color_system="auto", out=None):
+        self._out = out or sys.stdout
+        self._color_system = color_system
+        self._console = None
+        self._size = None
+        self._prev = []
+        # Clear the screen before the next frame (set on resize)
+        self._clear = False
+        self._first = renderable
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._out.write(_ENTER)
+        self._out.flush()
+        if self._first is not None:
+            self.update(self._first)
+            self._first = None
+
+    def stop(self):
+        self._out.write(_EXIT)
+        self._out.flush()
+
+    def _render(self, renderable, width, height):
+        if self._size != (width, height):
+            self._console = Console(
+                width=width, height=height, force_terminal=True,
+                color_system=self._color_system, legacy_windows=False,
+            )
+            self._size = (width, height)
+            # Terminal was resized: everything must be repainted
+            self._prev = []
+            self._clear = True
+        with self._console.capture() as capture:
+            self._console.print(renderable, end="")
+        return capture.get().split("\n")[:height]
+
+    def update(self, renderable, refresh=True):
+        """Render `renderable` and write only the lines that differ."""
+        width, height = get_terminal_size()
+        lines = self._render(renderable, width, height)
+
+        prev = self._prev
+        chunks = []
+        full = 0
+        written = 0
+        if self._clear:
+            # Part of this frame's cost, written with its lines
+            chunks.append(_CLEAR)
+            written = full = len(_CLEAR)
+            self._clear = False
+        for row, line in enumerate(lines):
+            chunk = f"\x1b[{row + 1};1H{line}\x1b[K"
+            size = len(chunk.encode())
+            full += size
+            if row < len(prev) and prev[row] == line:
+                continue
+            chunks.append(chunk)
+            written += size
+        self._prev = lines
+
+        if chunks:
+            self._out.write("".join(chunks))
+            self._out.flush()
+        record_output(written, full)
@@ -3,28 +3,79 @@ from rich.panel import Panel
 
 from utils.utils import (
     create_bar,
+    create_stacked_bar,
     get_color_for_percent,
-    format_sparkline,
 )
-
-
-from hardware.hardware import (
-    get_cpu_data
-)
-
-from utils.system_info import get_load_info
+from utils.graph import braille_graph
 
 from utils.ui import (
     add_omission
 )   
 
+# Trend graph cells per mode (two samples each); history keeps more than is drawn
+TREND_WIDTH = {"compact": 10, "full": 12}
+
+# Stacked bar colour and short label per /proc/stat time category
+TIME_STYLE = {
+    "user": ("green", "usr"),
+    "system": ("red", "sys"),
+    "irq": ("yellow", "irq"),
+    "softirq": ("magenta", "sirq"),
+    "steal": ("cyan", "st"),
+    "iowait": ("blue", "io"),
+}
+
+def _usage_bar(entry, width):
+    """Stacked time-category bar when a breakdown exists, plain bar otherwise."""
+    times = entry.get("times")
+    if not times:
+        return f"[{get_color_for_percent(entry['usage'])}]{create_bar(entry['usage'], width)}[/]"
+    return create_stacked_bar(
+        [(times[name], style[0]) for name, style in TIME_STYLE.items()], width
+    )
+
+def _time_legend(times):
+    """ "usr 12% sys 3% ..." with each label in its bar colour."""
+    return " ".join(
+        f"[{color}]{label}[/] {times[name]:.0f}%" for name, (color, label) in TIME_STYLE.items()
+    )
+
+# PSI labels, and stall % (of the last interval) that turns yellow / red
+PSI_LABELS = {"cpu": "cpu", "memory": "mem", "io": "io"}
+PSI_WARN, PSI_CRIT = 5, 20
+
+def _stall(line):
+    rate = line["rate"]
+    return f"[{get_color_for_percent(rate, PSI_WARN, PSI_CRIT)}]{rate:.1f}%[/]"
+
+def _cluster_state(cluster, clusters, short=False):
+    """Cap and throttling of one cluster; empty while it may run at full speed."""
+    if cluster["throttled"]:
+        text = "[bold red]⚠ throttled[/]"
+        if short:
+            return text
+        text += f" cap {cluster['limit']}/{cluster['max']} MHz"
+        if clusters.get("temp") is not None:
+            text += f" [red]{clusters['temp']:.0f}°C ↑{clusters['rise']:.1f}[/]"
+        return text
+    if cluster["capped"]:
+        return "[yellow]capped[/]" + ("" if short else f" {cluster['limit']}/{cluster['max']} MHz")
+    return "" if short else f"[dim]max {cluster['max']} MHz[/]"
+
+def _cluster_row(cluster, clusters, mode):
+    """Heading row of a cluster: name, shared frequency and cap state."""
+    label = f"[bold cyan]{cluster['label']}[/]"
+    if mode == "full":
+        return [label, f"{cluster['cur']} MHz", _cluster_state(cluster, clusters)]
+    return [label, f"{cluster['cur']}MHz {_cluster_state(cluster, clusters, short=True)}"]
+
 def _pad_row(ncols, values):
     vals = list(values)
     if len(vals) < ncols:
         vals.extend([""] * (ncols - len(vals)))
     return vals[:ncols]
 
-def create_cpu_panel(width, mode, history=None):
+def create_cpu_panel(snapshot, width, mode, history=None):
     """Create adaptive CPU panel with optional sparkline history."""
     cpu_table = Table(
         expand=True,
@@ -45,7 +96,7 @@ def create_cpu_panel(width, mode, history=None):
         cpu_table.add_column("Core", style="bold magenta", width=6)
         cpu_table.add_column("Usage", ratio=1)
         if show_trend:
-            cpu_table.add_column("Trend", width=10)
+            cpu_table.add_column("Trend", width=TREND_WIDTH[mode])
         bar_width = max(10, width // 4)
         ncols = 3 if show_trend else 2
     else:
@@ -53,20 +104,50 @@ def create_cpu_panel(width, mode, history=None):
         cpu_table.add_column("Freq", justify="right", width=10)
         cpu_table.add_column("Usage", ratio=1)
         if show_trend:
-            cpu_table.add_column("Trend", width=12)
+            cpu_table.add_column("Trend", width=TREND_WIDTH[mode])
         bar_width = max(15, min(30, width // 4))
         ncols = 4 if show_trend else 3
 
-    cpu_cores = get_cpu_data()
+    cpu_cores = snapshot["cpu"]
 
     cores_to_show = cpu_cores[:4] if mode == "minimal" else cpu_cores
     if mode == "minimal" and len(cpu_cores) > 4:
         add_omission(f"{len(cpu_cores) - 4} CPU cores")
 
-    for i, c in enumerate(cores_to_show):
+    # Whole-system line first, from the aggregate /proc/stat counters
+    total = snapshot.get("cpu_total")
+    if total and mode != "minimal":
+        usage = total["usage"]
+        row = ["[bold]All[/]"]
+        if mode == "full":
+            row.append("")
+        row.append(f"{_usage_bar(total, bar_width)} [{get_color_for_percent(usage)}]{usage:.1f}%[/]")
+        if show_trend:
+            row.append(braille_graph(history, "cpu", TREND_WIDTH[mode], hi=100.0))
+        cpu_table.add_row(*_pad_row(ncols, row))
+
+    # Group cores under their cpufreq cluster when clusters share cores;
+    # history stays keyed by the core's position in the cpu list
+    clusters = snapshot.get("clusters") or {}
+    cluster_list = clusters.get("clusters") or []
+    cluster_of = {cpu: cl for cl in cluster_list for cpu in cl["cpus"]}
+    grouped = mode != "minimal" and 0 < len(cluster_list) < len(cpu_cores)
+    rows = list(enumerate(cores_to_show))
+    if grouped:
+        rank = {cl["name"]: n for n, cl in enumerate(cluster_list)}
+        rows.sort(key=lambda row: rank.get(row[1].get("cluster"), len(rank)))
+    heading = None
+
+    for i, c in rows:
+        cluster = cluster_of.get(c.get("id"))
+        if grouped and cluster is not heading:
+            heading = cluster
+            if cluster is not None:
+                cpu_table.add_row(*_pad_row(ncols, _cluster_row(cluster, clusters, mode)))
+
         usage = float(c.get("usage", 0.0))
         color = get_color_for_percent(usage)
-        bar = create_bar(usage, bar_width)
+        bar = _usage_bar(c, bar_width)
 
         # "~" means proxy (freq-based), not true busy%
         src = c.get("usage_src", "")
@@ -75,32 +156,37 @@ def create_cpu_panel(width, mode, history=None):
         if mode == "minimal":
             cpu_table.add_row(
                 c.get("id", "?")[-1:],
-                f"[{color}]{bar}[/] {usage:.0f}%{suffix}",
+                f"{bar} [{color}]{usage:.0f}%{suffix}[/]",
             )
         elif mode == "compact":
             row = [
-                c.get("id", "?")[-4:],
-                f"[{color}]{bar}[/] {usage:.0f}%{suffix}",
+                ("  " if grouped else "") + c.get("id", "?")[-4:],
+                f"{bar} [{color}]{usage:.0f}%{suffix}[/]",
             ]
             if show_trend:
-                spark = format_sparkline(history.get(f"cpu{i}", [])) if history else ""
+                spark = braille_graph(history, f"cpu{i}", TREND_WIDTH[mode], hi=100.0)
                 row.append(spark)
             cpu_table.add_row(*_pad_row(ncols, row))
         else:
             freq_str = f"{c.get('cur', 0)} MHz" if c.get("cur", 0) > 0 else "N/A"
+            if grouped and cluster is not None:
+                # Shown once on the cluster's heading row
+                freq_str = ""
+            elif cluster is not None and (cluster["throttled"] or cluster["capped"]):
+                freq_str = f"[{'bold red' if cluster['throttled'] else 'yellow'}]{freq_str}[/]"
             row = [
-                c.get("id", "?"),
+                ("  " if grouped else "") + c.get("id", "?"),
                 freq_str,
-                f"[{color}]{bar}[/] {usage:.1f}%{suffix}",
+                f"{bar} [{color}]{usage:.1f}%{suffix}[/]",
             ]
             if show_trend:
-                spark = format_sparkline(history.get(f"cpu{i}", [])) if history else ""
+                spark = braille_graph(history, f"cpu{i}", TREND_WIDTH[mode], hi=100.0)
                 row.append(spark)
             cpu_table.add_row(*_pad_row(ncols, row))
 
     # Add load average (skip in minimal mode)
     if mode != "minimal":
-        load = get_load_info()
+        load = snapshot["load"]
         if load:
             cpu_table.add_row(*([""] * ncols))
             if mode == "full":
@@ -114,6 +200,11 @@ def create_cpu_panel(width, mode, history=None):
                         ],
                     )
                 )
+                if total:
+                    # Where the time went: iowait is stalled, not computing
+                    cpu_table.add_row(
+                        *_pad_row(ncols, ["[bold]Time[/]", "", _time_legend(total["times"])])
+                    )
                 cpu_table.add_row(
                     *_pad_row(
                         ncols,
@@ -137,5 +228,24 @@ def create_cpu_panel(width, mode, history=None):
         else:
             add_omission("Load avg")
 
+        # Stall rates: the share of time tasks waited on each resource
+        pressure = snapshot.get("pressure")
+        if pressure and mode == "full":
+            for resource, lines in pressure.items():
+                row = [
+                    f"[bold]PSI {PSI_LABELS.get(resource, resource)}[/]",
+                    f"{lines['some']['avg10']:.1f}",
+                    f"some {_stall(lines['some'])}"
+                    + (f" full {_stall(lines['full'])}" if "full" in lines else ""),
+                ]
+                if show_trend:
+                    row.append(braille_graph(history, f"psi_{resource}", TREND_WIDTH[mode]))
+                cpu_table.add_row(*_pad_row(ncols, row))
+        elif pressure:
+            cpu_table.add_row(*_pad_row(ncols, [
+                "[bold]PSI[/]",
+                " ".join(f"{PSI_LABELS.get(r, r)} {_stall(lines['some'])}" for r, lines in pressure.items()),
+            ]))
+
     title = "💻" if mode == "minimal" else "💻 CPU"
     return Panel(cpu_table, title=title, border_style="green")
@@ -9,8 +9,27 @@ from utils.ui import (
 
 
 
-def create_footer_panel(width, height, mode):
-    """Create footer showing terminal size and omitted information."""
+def monitor_text(monitor, mode):
+    """Own CPU/RSS and tick interval, plus the slowest collector or panel in full mode."""
+    if not monitor or monitor.get("rss_mb") is None:
+        return ""
+    cpu = monitor.get("cpu")
+    text = f"Self: {cpu:.1f}% " if cpu is not None else "Self: "
+    text += f"{monitor['rss_mb']:.0f}M"
+    if monitor.get("interval"):
+        text += f" @{monitor['interval']:.1f}s"
+    slowest = monitor.get("slowest")
+    if mode == "full" and slowest:
+        text += f" (slowest {slowest[0]} {slowest[1]:.1f}ms)"
+    if monitor.get("out_bytes") is not None:
+        text += f" Out: {monitor['out_bytes'] / 1024:.1f}K/frame"
+        if mode == "full" and monitor.get("out_full_bytes"):
+            text += f" of {monitor['out_full_bytes'] / 1024:.1f}K"
+    return text
+
+
+def create_footer_panel(width, height, mode, monitor=None, alerts=None):
+    """Create footer showing terminal size, monitor overhead, firing alerts and omitted information."""
     omissions = get_omissions()
 
     size_text = f"Terminal: {width}x{height}"
@@ -18,10 +37,22 @@ def create_footer_panel(width, height, mode):
 
     parts = [Text(size_text, style="bold cyan"), Text("  •  ", style="dim"), Text(mode_text, style="bold yellow")]
 
+    self_text = monitor_text(monitor, mode) if mode != "minimal" else ""
+    if self_text:
+        parts.extend([Text("  •  ", style="dim"), Text(self_text, style="magenta")])
+
+    if alerts:
+        # Oldest first; the rest only as a count
+        alert_str = alerts[0]["rule"]
+        if len(alerts) > 1:
+            alert_str += f" (+{len(alerts) - 1})"
+        parts.extend([Text("  •  ", style="dim"), Text(f"⚠ {alert_str}", style="bold red")])
+
     if omissions:
         omit_str = ", ".join(omissions)
-        # Leave some room for the rest of the footer text
-        max_len = max(10, width - 45)
+        # Leave room for the rest of the footer text, borders and padding
+        used = sum(len(p.plain) for p in parts) + len("  •  Omitted: ")
+        max_len = max(10, width - 4 - used)
         if len(omit_str) > max_len:
             omit_str = omit_str[: max_len - 3] + "..."
         parts.extend(
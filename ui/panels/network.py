@@ -9,14 +9,50 @@ from utils.utils import (
     truncate_text,
     get_color_for_percent,
 )
+from utils.graph import braille_graph
 
+# Trend graph cells per mode
+TREND_WIDTH = {"compact": 8, "full": 12}
 
 
-from utils.network import get_net_stats
+# Interfaces listed in full mode, ranked by current throughput
+MAX_IFACES = 3
 
-def create_network_panel(width, mode):
-    """Create adaptive network panel."""
-    net = get_net_stats()
+_STATE_STYLE = {"up": "green", "down": "red", "dormant": "yellow"}
+
+
+def _interface_table(interfaces):
+    """Per-interface rates, packets, errors/drops and link state."""
+    table = Table(box=None, header_style="bold cyan", padding=(0, 1))
+    table.add_column("Iface", style="bold", no_wrap=True)
+    table.add_column("Link", no_wrap=True)
+    table.add_column("↓KB/s", justify="right")
+    table.add_column("↑KB/s", justify="right")
+    table.add_column("Pkt/s", justify="right")
+    table.add_column("Err/Drp", justify="right")
+
+    items = list(interfaces.items())
+    for iface, data in items[:MAX_IFACES]:
+        state = data.get("state", "?")
+        # New errors or drops this interval are flagged in red
+        bad = data.get("new_errors", 0) or data.get("new_drops", 0)
+        table.add_row(
+            truncate_text(iface, 10),
+            f"[{_STATE_STYLE.get(state, 'dim')}]{state}[/]",
+            f"{data.get('rx_speed', 0.0):.1f}",
+            f"{data.get('tx_speed', 0.0):.1f}",
+            f"{data.get('rx_pps', 0.0) + data.get('tx_pps', 0.0):.0f}",
+            f"[{'red' if bad else 'dim'}]{data.get('errors', 0)}/{data.get('drops', 0)}[/]",
+        )
+    if len(items) > MAX_IFACES:
+        add_omission(f"{len(items) - MAX_IFACES} network interfaces")
+    return table
+
+
+def create_network_panel(snapshot, width, mode, history=None):
+    """Create adaptive network panel with optional throughput graphs."""
+    net = snapshot["net"]
+    show_trend = bool(history) and mode != "minimal"
 
     net_table = Table(
         expand=True,
@@ -35,37 +71,43 @@ def create_network_panel(width, mode):
         net_table.add_column("Total", justify="center", width=10)
         net_table.add_column("Speed", justify="right")
     else:
-        net_table.add_column("Direction", style="bold", width=8)
-        net_table.add_column("Total", justify="center", width=12)
-        net_table.add_column("Speed", justify="right", width=15)
+        net_table.add_column("Direction", style="bold", width=9)
+        net_table.add_column("Total", justify="right", width=9)
+        net_table.add_column("Speed", justify="right", width=12)
+    if show_trend:
+        net_table.add_column("Trend", width=TREND_WIDTH[mode])
 
     rx_color = get_color_for_percent(net["rx_speed"] / 10, 10, 100)  # KB/s scaled
     tx_color = get_color_for_percent(net["tx_speed"] / 10, 10, 100)
 
+    # Each direction on its own auto-ranging KB/s scale
+    trend = []
+    if show_trend:
+        trend = [
+            f"[{rx_color}]{braille_graph(history, 'net_rx', TREND_WIDTH[mode])}[/]",
+            f"[{tx_color}]{braille_graph(history, 'net_tx', TREND_WIDTH[mode])}[/]",
+        ]
+    rx_trend = trend[:1]
+    tx_trend = trend[1:]
+
     if mode == "minimal":
         net_table.add_row("↓", f"{net['rx_total']:.1f}M", f"[{rx_color}]{net['rx_speed']:.0f}K[/]")
         net_table.add_row("↑", f"{net['tx_total']:.1f}M", f"[{tx_color}]{net['tx_speed']:.0f}K[/]")
     elif mode == "compact":
-        net_table.add_row("📥", f"{net['rx_total']:.1f}M", f"[{rx_color}]{net['rx_speed']:.0f}K/s[/]")
-        net_table.add_row("📤", f"{net['tx_total']:.1f}M", f"[{tx_color}]{net['tx_speed']:.0f}K/s[/]")
+        net_table.add_row("📥", f"{net['rx_total']:.1f}M", f"[{rx_color}]{net['rx_speed']:.0f}K/s[/]", *rx_trend)
+        net_table.add_row("📤", f"{net['tx_total']:.1f}M", f"[{tx_color}]{net['tx_speed']:.0f}K/s[/]", *tx_trend)
     else:
-        net_table.add_row("📥 DOWN", f"{net['rx_total']:.1f} MB", f"[{rx_color}]{net['rx_speed']:.1f} KB/s[/]")
-        net_table.add_row("📤 UP", f"{net['tx_total']:.1f} MB", f"[{tx_color}]{net['tx_speed']:.1f} KB/s[/]")
+        net_table.add_row("📥 DOWN", f"{net['rx_total']:.1f} MB", f"[{rx_color}]{net['rx_speed']:.1f} KB/s[/]", *rx_trend)
+        net_table.add_row("📤 UP", f"{net['tx_total']:.1f} MB", f"[{tx_color}]{net['tx_speed']:.1f} KB/s[/]", *tx_trend)
 
     interfaces = net.get("interfaces") or {}
     if interfaces and mode == "full":
-        net_table.add_row("", "", "")
-        net_table.add_row("[bold]Interfaces[/]", "", "")
-        items = list(interfaces.items())
-        for iface, data in items[:3]:
-            iface_display = truncate_text(iface, 10)
-            net_table.add_row(
-                f"[dim]{iface_display}[/]",
-                f"{data['rx']/(1024**2):.1f} MB",
-                f"{data['tx']/(1024**2):.1f} MB",
-            )
-        if len(items) > 3:
-            add_omission(f"{len(items) - 3} network interfaces")
+        # Busiest links beside the totals, so the panel keeps its height
+        grid = Table.grid(expand=True, padding=(0, 2))
+        grid.add_column()
+        grid.add_column(ratio=1)
+        grid.add_row(net_table, _interface_table(interfaces))
+        net_table = grid
     elif interfaces and mode != "full":
         add_omission("Network interfaces")
 
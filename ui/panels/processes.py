@@ -10,16 +10,41 @@ from utils.utils import (
     get_color_for_percent,
 )
 
-from utils.system_info import get_top_processes
 
+# Panel title suffix per grouping mode
+_GROUP_TITLES = {"tree": "by tree", "name": "by name", "uid": "by user"}
 
-def create_processes_panel(width, mode):
+
+def _rows(procs, limit, name_len):
+    """
+    (pid, name, cpu, mem) rows: groups show their process count, expanded
+    groups are followed by their members. At most `limit` rows.
+    """
+    rows = []
+    for p in procs:
+        name = truncate_text(p.get("name", "?"), name_len)
+        if p.get("count", 1) > 1:
+            name = f"{name} [dim]×{p['count']}[/]"
+        rows.append((p.get("pid", ""), name, p.get("cpu", 0.0), p.get("mem", 0.0)))
+        for m in p.get("members", ()):
+            rows.append((m["pid"], f"[dim] └[/] {truncate_text(m['name'], name_len - 3)}",
+                         m["cpu"], m["mem"]))
+        if len(rows) >= limit:
+            break
+    return rows[:limit]
+
+
+def create_processes_panel(snapshot, width, mode):
     """Create top processes panel (compact and full modes only)."""
     if mode == "minimal":
         add_omission("Top processes")
         return None
 
-    procs = get_top_processes(limit=5 if mode == "compact" else 8)
+    if mode == "compact":
+        rows = _rows(snapshot["procs"], 5, 20)
+    else:
+        rows = _rows(snapshot["procs"], 8, 30)
+    grouped = next((p["group"] for p in snapshot["procs"] if "group" in p), None)
 
     proc_table = Table(
         expand=True,
@@ -33,29 +58,29 @@ def create_processes_panel(width, mode):
         proc_table.add_column("PID", width=7, style="dim")
         proc_table.add_column("Name", ratio=1)
         proc_table.add_column("CPU", justify="right", width=6)
-        for p in procs:
-            name = truncate_text(p.get("name", "?"), 20)
-            cpu = float(p.get("cpu", 0.0))
+        for pid, name, cpu, _ in rows:
+            cpu = float(cpu)
             cpu_color = get_color_for_percent(cpu, 30, 70)
-            proc_table.add_row(str(p.get("pid", "")), name, f"[{cpu_color}]{cpu:.1f}%[/]")
+            proc_table.add_row(str(pid), name, f"[{cpu_color}]{cpu:.1f}%[/]")
         title = "🔥 Top Procs"
     else:
         proc_table.add_column("PID", width=8, style="dim")
         proc_table.add_column("Name", ratio=2)
         proc_table.add_column("CPU", justify="right", width=7)
         proc_table.add_column("MEM", justify="right", width=7)
-        for p in procs:
-            name = truncate_text(p.get("name", "?"), 30)
-            cpu = float(p.get("cpu", 0.0))
-            mem = float(p.get("mem", 0.0))
+        for pid, name, cpu, mem in rows:
+            cpu = float(cpu)
+            mem = float(mem)
             cpu_color = get_color_for_percent(cpu, 30, 70)
             mem_color = get_color_for_percent(mem, 5, 15)
             proc_table.add_row(
-                str(p.get("pid", "")),
+                str(pid),
                 name,
                 f"[{cpu_color}]{cpu:.1f}%[/]",
                 f"[{mem_color}]{mem:.1f}%[/]",
             )
         title = "🔥 Top Processes"
 
+    if grouped:
+        title += f" ({_GROUP_TITLES[grouped]})"
     return Panel(proc_table, title=title, border_style="red")
@@ -8,20 +8,77 @@ from utils.ui import (
 from utils.utils import (
     create_bar,
     get_color_for_percent,
-    format_sparkline,
+    truncate_text,
 )
+from utils.graph import braille_graph
 
-from hardware.hardware import (
-    get_mem,
-    get_storage,
-    get_disk_io,
-)
+# Block devices listed in full mode, busiest first
+MAX_DISKS = 3
+# History tier (bucket seconds) behind the long memory trend, per mode
+LONG_TREND_BUCKET = {"compact": 10, "full": 60}
+
+
+def _long_trend(history, cells, mode):
+    """
+    Memory over the last hour or so from a downsampled history tier, with
+    the tier's min-max over that span when it keeps them. None until the
+    tier has completed a bucket.
+    """
+    bucket = LONG_TREND_BUCKET[mode]
+    graph = braille_graph(history, "memory", cells, hi=100.0, bucket=bucket)
+    if not graph:
+        return None
+    tier = history["memory"].tier(bucket)
+    span = len(tier.avg.tail(2 * cells)) * bucket
+    label = f"{span // 60}m" if span >= 60 else f"{span}s"
+    text = f"[dim]{label}:[/] [cyan]{graph}[/]"
+    if tier.min is not None:
+        lo, hi = min(tier.min.tail(2 * cells)), max(tier.max.tail(2 * cells))
+        text += f" [dim]{lo:.0f}-{hi:.0f}%[/]"
+    return text
 
-def create_resources_panel(width, mode, history=None):
-    """Create adaptive memory and storage panel."""
-    mem = get_mem()
-    storage = get_storage()
-    disk_io = get_disk_io()
+
+def _disk_table(devices, limit=MAX_DISKS):
+    """
+    Per-device read/write MB/s, IOPS, latency, queue depth and %util,
+    busiest first, at most `limit` devices.
+    """
+    table = Table(box=None, show_header=True, header_style="dim", pad_edge=False, padding=(0, 1))
+    table.add_column("Dev", style="cyan", no_wrap=True)
+    table.add_column("R", justify="right")
+    table.add_column("W", justify="right")
+    table.add_column("IOPS", justify="right")
+    table.add_column("ms", justify="right")
+    table.add_column("Q", justify="right")
+    table.add_column("Util", justify="right")
+
+    ranked = sorted(devices.items(), key=lambda item: (-item[1]["util"], item[0]))
+    for name, dev in ranked[:limit]:
+        color = get_color_for_percent(dev["util"], 50, 90)
+        table.add_row(
+            truncate_text(name, 8),
+            f"{dev['read_speed']:.1f}",
+            f"{dev['write_speed']:.1f}",
+            f"{dev['read_iops'] + dev['write_iops']:.0f}",
+            f"{dev['latency_ms']:.1f}",
+            f"{dev['queue']:.1f}",
+            f"[{color}]{dev['util']:.0f}%[/]",
+        )
+    if len(ranked) > limit:
+        add_omission(f"{len(ranked) - limit} disks")
+    return table
+
+
+def create_resources_panel(snapshot, width, mode, history=None, height=None):
+    """
+    Create adaptive memory and storage panel.
+
+    `height` (lines, borders included) limits the disk table in full mode
+    to the rows that fit; None draws every row up to MAX_DISKS.
+    """
+    mem = snapshot["mem"]
+    storage = snapshot["storage"]
+    disk_io = snapshot["disk_io"]
 
     sys_table = Table(
         expand=True,
@@ -49,8 +106,14 @@ def create_resources_panel(width, mode, history=None):
         )
         sys_table.add_row(f"[{mem_color}]{mem_bar}[/] {mem['percent']:.1f}%")
         if history and "memory" in history:
-            spark = format_sparkline(history["memory"])
-            sys_table.add_row(f"[dim]Trend: {spark}[/]")
+            # Two rows of Braille (8 levels) in full mode, one in compact
+            rows = 2 if mode == "full" else 1
+            graph = braille_graph(history, "memory", max(8, min(20, width // 5)), rows, hi=100.0)
+            sep = "\n" if rows > 1 else " "
+            sys_table.add_row(f"[dim]Trend:[/]{sep}[cyan]{graph}[/]")
+            long_trend = _long_trend(history, max(8, min(20, width // 5)), mode)
+            if long_trend:
+                sys_table.add_row(long_trend)
         if mode == "full":
             sys_table.add_row(f"[dim]Cached: {mem['cached']/1024:.1f} GB[/]")
 
@@ -83,8 +146,19 @@ def create_resources_panel(width, mode, history=None):
 
     # Disk I/O (full mode only)
     if disk_io and mode == "full":
-        sys_table.add_row(f"[dim]Read: {disk_io['read_speed']:.1f} MB/s[/]")
-        sys_table.add_row(f"[dim]Write: {disk_io['write_speed']:.1f} MB/s[/]")
+        sys_table.add_row(
+            f"[dim]I/O: R {disk_io['read_speed']:.1f} W {disk_io['write_speed']:.1f} MB/s[/]"
+        )
+        devices = disk_io.get("devices") or {}
+        limit = MAX_DISKS
+        if height is not None:
+            # Borders, the lines above and the table's header row
+            used = sum(str(cell).count("\n") + 1 for cell in sys_table.columns[0].cells)
+            limit = max(0, min(MAX_DISKS, height - 2 - used - 1))
+        if devices and limit:
+            sys_table.add_row(_disk_table(devices, limit))
+        elif devices:
+            add_omission(f"{len(devices)} disks")
     elif disk_io and mode != "full":
         add_omission("Disk IO stats")
 
@@ -10,13 +10,7 @@ from utils.utils import (
 )
 
 
-from hardware.hardware import (
-    get_temps,
-    get_battery,
-)
-
-
-def create_sensors_panel(width, mode):
+def create_sensors_panel(snapshot, width, mode):
     """Create adaptive temperature and battery panel."""
     extra_table = Table(
         expand=True,
@@ -26,7 +20,7 @@ def create_sensors_panel(width, mode):
     )
     extra_table.add_column("Sensor", style="bold white")
 
-    temps = get_temps()
+    temps = snapshot["temps"]
     temp_name_width = max(8, width // 8) if mode == "full" else max(6, width // 10)
 
     temps_to_show = temps[:2] if mode == "minimal" else temps
@@ -42,17 +36,24 @@ def create_sensors_panel(width, mode):
         if mode != "minimal":
             extra_table.add_row("[dim]No sensors[/]")
 
-    battery = get_battery()
+    battery = snapshot["battery"]
     if battery:
         extra_table.add_row("")
         batt_color = get_color_for_percent(100 - battery["level"], 50, 80)  # inverted
+        # Last good reading while termux-api is slow or failing
+        stale = battery.get("stale", False)
+        if stale:
+            batt_color = "dim"
         if mode == "minimal":
             extra_table.add_row("[bold cyan]Batt[/]")
-            extra_table.add_row(f"[{batt_color}]{battery['level']}%[/]")
+            extra_table.add_row(f"[{batt_color}]{battery['level']}%{'?' if stale else ''}[/]")
         else:
             extra_table.add_row("[bold cyan]Battery[/]")
             status = truncate_text(battery.get("status", "Unknown"), 10)
             extra_table.add_row(f"[{batt_color}]{battery['level']}%[/] {status}")
+            if stale:
+                age = battery.get("age") or 0
+                extra_table.add_row(f"[dim]stale ({age:.0f}s old)[/]")
 
             if battery.get("temp", 0) > 0 and mode == "full":
                 temp_color = get_color_for_percent(battery["temp"], 40, 45)
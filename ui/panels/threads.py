@@ -0,0 +1,58 @@
+from rich.table import Table
+from rich.panel import Panel
+
+from utils.ui import (
+    add_omission
+)
+
+from utils.utils import (
+    truncate_text,
+    get_color_for_percent,
+)
+
+# Thread states from /proc/[pid]/task/*/stat worth highlighting
+_STATE_STYLE = {"R": "green", "D": "red", "Z": "red", "T": "yellow"}
+
+
+def create_threads_panel(snapshot, width, mode):
+    """Per-thread drilldown for one PID, shown in place of the processes panel."""
+    if mode == "minimal":
+        add_omission("Thread drilldown")
+        return None
+
+    info = snapshot["threads"]
+    threads = info["threads"][: 5 if mode == "compact" else 8]
+
+    thread_table = Table(
+        expand=True,
+        box=None,
+        show_header=True,
+        header_style="bold red",
+        padding=(0, 1),
+    )
+    thread_table.add_column("TID", width=8, style="dim")
+    thread_table.add_column("Thread", ratio=2)
+    thread_table.add_column("S", width=1)
+    if mode == "full":
+        thread_table.add_column("CPU#", justify="right", width=4)
+    thread_table.add_column("CPU", justify="right", width=7)
+
+    if info["gone"]:
+        thread_table.add_row("", f"[red]process {info['pid']} has exited[/]")
+    for t in threads:
+        cpu = float(t["cpu"])
+        cpu_color = get_color_for_percent(cpu, 30, 70)
+        row = [
+            str(t["tid"]),
+            truncate_text(t["name"], 20 if mode == "compact" else 30),
+            f"[{_STATE_STYLE.get(t['state'], 'dim')}]{t['state']}[/]",
+        ]
+        if mode == "full":
+            row.append(str(t["last_cpu"]))
+        row.append(f"[{cpu_color}]{cpu:.1f}%[/]")
+        thread_table.add_row(*row)
+    if info["count"] > len(threads):
+        add_omission(f"{info['count'] - len(threads)} threads")
+
+    title = f"🧵 {truncate_text(info['name'], 20)} ({info['pid']}): {info['count']} threads, {info['cpu']:.1f}%"
+    return Panel(thread_table, title=title, border_style="red")
@@ -4,32 +4,118 @@ from rich.layout import Layout
 
 
 from utils.utils import (
-    get_terminal_size
+    get_terminal_size,
 )
 
-from utils.system_info import get_sys_info
+from utils.snapshot import take_snapshot
 from utils.ui import (
     reset_omissions,
+    get_omissions,
     determine_layout_mode
 )
 
+from ui.cache import cached_panel
 from ui.panels.cpu import create_cpu_panel
-from ui.panels.footer import create_footer_panel
+from ui.panels.footer import create_footer_panel, monitor_text
 from ui.panels.header import create_header_panel
 from ui.panels.network import create_network_panel
 from ui.panels.processes import create_processes_panel
 from ui.panels.resources import create_resources_panel
 from ui.panels.sensors import create_sensors_panel
+from ui.panels.threads import create_threads_panel
 
 
 
-def generate_layout(history=None):
-    """Generate adaptive layout based on terminal size."""
+# Names of the panels drawn by the last generate_layout()
+_shown = set()
+
+
+def get_shown_panels():
+    """Panels drawn in the most recent layout (omitted ones excluded)."""
+    return set(_shown)
+
+
+def _counts(history, names):
+    """Sample counts of the history series a panel draws, for its cache key."""
+    if not history:
+        return None
+    return tuple(series.count if series is not None else 0 for series in map(history.get, names))
+
+
+def _highlight(panel):
+    """Mark a freshly built panel as showing a firing alert."""
+    if panel is not None:
+        panel.border_style = "bold red"
+        panel.title = f"[bold red]⚠[/bold red] {panel.title}"
+    return panel
+
+
+def _build(name, key, create, *args, alert=False):
+    """
+    Build one panel, or reuse the previous one if `key` (its inputs plus
+    width, mode and alert state) is unchanged. Its cost is recorded when
+    Rich renders it (see ui.cache.CachedRender).
+    """
+    if alert:
+        panel = cached_panel(name, key, lambda: _highlight(create(*args)))
+    else:
+        panel = cached_panel(name, key, lambda: create(*args))
+    if panel is not None:
+        _shown.add(name)
+    return panel
+
+
+def generate_layout(history=None, snapshot=None):
+    """
+    Generate adaptive layout based on terminal size.
+
+    All panels render from the same snapshot; one is taken here if the
+    caller did not already collect it for this tick.
+    """
     reset_omissions()
+    _shown.clear()
 
     width, height = get_terminal_size()
     mode = determine_layout_mode(width, height)
-    info = get_sys_info()
+    if snapshot is None:
+        snapshot = take_snapshot()
+    info = snapshot["info"]
+
+    # What each panel renders from; a panel is rebuilt only when its inputs,
+    # the width or the mode change
+    # Trend graphs change only when their own series gain samples
+    cpu_series = ["cpu"] + [f"cpu{i}" for i in range(len(snapshot["cpu"]))]
+    cpu_series += [f"psi_{resource}" for resource in snapshot.get("pressure") or ()]
+    firing = snapshot.get("alerts") or []
+    alerted = {alert["panel"] for alert in firing}
+    inputs = {
+        "header": (info["os"], info["kernel"], info["arch"], info["uptime"]),
+        "cpu": (snapshot["cpu"], snapshot.get("cpu_total"), snapshot["load"],
+                snapshot.get("pressure"), snapshot.get("clusters"), _counts(history, cpu_series)),
+        "resources": (snapshot["mem"], snapshot["storage"], snapshot["disk_io"],
+                      _counts(history, ("memory",))),
+        "sensors": (snapshot["temps"], snapshot["battery"]),
+        "network": (snapshot["net"], _counts(history, ("net_rx", "net_tx"))),
+        "processes": (snapshot["procs"],),
+        "threads": (snapshot.get("threads"),),
+    }
+
+    def build_processes():
+        # An open thread drilldown takes the processes panel's place
+        if snapshot.get("threads"):
+            return build("threads", create_threads_panel, snapshot, width, mode)
+        return build("processes", create_processes_panel, snapshot, width, mode)
+
+    def build(name, create, *args):
+        if name == "footer":
+            # Known only once every other panel has recorded its omissions
+            monitor = monitor_text(snapshot.get("monitor"), mode)
+            rules = tuple(alert["rule"] for alert in firing)
+            key = (height, tuple(get_omissions()), monitor, rules)
+        else:
+            key = inputs[name]
+        alert = name in alerted
+        return _build(name, (key, width, mode, alert), create, *args, alert=alert)
 
     layout = Layout()
 
@@ -45,12 +131,12 @@ def generate_layout(history=None):
             Layout(name="network", size=5),
             Layout(name="footer", size=footer_size),
         )
-        layout["header"].update(create_header_panel(info, width, mode))
-        layout["cpu"].update(create_cpu_panel(width, mode, history))
-        layout["resources"].update(create_resources_panel(width, mode, history))
-        layout["sensors"].update(create_sensors_panel(width, mode))
-        layout["network"].update(create_network_panel(width, mode))
-        layout["footer"].update(create_footer_panel(width, height, mode))
+        layout["header"].update(build("header", create_header_panel, info, width, mode))
+        layout["cpu"].update(build("cpu", create_cpu_panel, snapshot, width, mode, history))
+        layout["resources"].update(build("resources", create_resources_panel, snapshot, width, mode, history))
+        layout["sensors"].update(build("sensors", create_sensors_panel, snapshot, width, mode))
+        layout["network"].update(build("network", create_network_panel, snapshot, width, mode, history))
+        layout["footer"].update(build("footer", create_footer_panel, width, height, mode, snapshot.get("monitor"), firing))
         return layout
 
     if mode == "compact":
@@ -63,15 +149,15 @@ def generate_layout(history=None):
             Layout(name="network", size=5),
             Layout(name="footer", size=footer_size),
         )
-        layout["header"].update(create_header_panel(info, width, mode))
-        layout["cpu"].update(create_cpu_panel(width, mode, history))
-        layout["resources"].update(create_resources_panel(width, mode, history))
-        layout["sensors"].update(create_sensors_panel(width, mode))
-        layout["network"].update(create_network_panel(width, mode))
-        proc_panel = create_processes_panel(width, mode)
+        layout["header"].update(build("header", create_header_panel, info, width, mode))
+        layout["cpu"].update(build("cpu", create_cpu_panel, snapshot, width, mode, history))
+        layout["resources"].update(build("resources", create_resources_panel, snapshot, width, mode, history))
+        layout["sensors"].update(build("sensors", create_sensors_panel, snapshot, width, mode))
+        layout["network"].update(build("network", create_network_panel, snapshot, width, mode, history))
+        proc_panel = build_processes()
         if proc_panel:
             layout["processes"].update(proc_panel)
-        layout["footer"].update(create_footer_panel(width, height, mode))
+        layout["footer"].update(build("footer", create_footer_panel, width, height, mode, snapshot.get("monitor"), firing))
         return layout
 
     # full
@@ -94,15 +180,19 @@ def generate_layout(history=None):
         Layout(name="sensors", ratio=1),
     )
 
-    layout["header"].update(create_header_panel(info, width, mode))
-    layout["body"]["left_col"]["cpu"].update(create_cpu_panel(width, mode, history))
-    layout["body"]["right_col"]["resources"].update(create_resources_panel(width, mode, history))
-    layout["body"]["right_col"]["sensors"].update(create_sensors_panel(width, mode))
-    layout["network"].update(create_network_panel(width, mode))
-
-    proc_panel = create_processes_panel(width, mode)
+    layout["header"].update(build("header", create_header_panel, info, width, mode))
+    layout["body"]["left_col"]["cpu"].update(build("cpu", create_cpu_panel, snapshot, width, mode, history))
+    # Half of the body, rounded down like the layout may split it
+    resources_height = (height - header_size - 6 - footer_size) // 2
+    inputs["resources"] += (resources_height,)
+    layout["body"]["right_col"]["resources"].update(
+        build("resources", create_resources_panel, snapshot, width, mode, history, resources_height))
+    layout["body"]["right_col"]["sensors"].update(build("sensors", create_sensors_panel, snapshot, width, mode))
+    layout["network"].update(build("network", create_network_panel, snapshot, width, mode, history))
+
+    proc_panel = build_processes()
     if proc_panel:
         layout["body"]["left_col"]["processes"].update(proc_panel)
 
-    layout["footer"].update(create_footer_panel(width, height, mode))
+    layout["footer"].update(build("footer", create_footer_panel, width, height, mode, snapshot.get("monitor"), firing))
     return layout
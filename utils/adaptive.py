@@ -0,0 +1,114 @@
+# adaptive.py - Tick interval that follows activity, battery and terminal visibility
+
+import os
+import sys
+
+from utils import scheduler
+
+# Tick bounds (seconds) and the interval used before the first decision
+MIN_INTERVAL = 0.2
+MAX_INTERVAL = 5.0
+BASE_INTERVAL = 0.5
+# Never tick faster than this while discharging at or below LOW_BATTERY %
+LOW_BATTERY = 20
+LOW_BATTERY_INTERVAL = 2.0
+# Stable ticks stretch the interval by this factor
+BACKOFF = 1.5
+
+# A change this large between ticks counts as a jump (percentage points)
+CPU_JUMP = 15.0
+PSI_JUMP = 5.0
+
+# Sampled at the tick rate, so a jump is seen as soon as it happens
+FOLLOW_TICK = ("cpu", "pressure")
+
+# Panel -> sources only that panel reads; paused while it is not shown
+PANEL_SOURCES = {
+    "processes": ("procs",),
+    "threads": ("threads",),
+}
+
+_state = {
+    "interval": BASE_INTERVAL,
+    # (cpu %, max PSI some %) at the previous tick
+    "last": None,
+    # Registered cadence of every source we have changed
+    "base": {},
+}
+
+
+def terminal_visible():
+    """False when the monitor runs in a background job (e.g. after Ctrl+Z, bg)."""
+    try:
+        return os.tcgetpgrp(sys.stdout.fileno()) == os.getpgrp()
+    except (OSError, ValueError, AttributeError):
+        return True
+
+
+def _battery_low(battery):
+    if not battery:
+        return False
+    status = str(battery.get("status", "")).upper()
+    return battery.get("level", 100) <= LOW_BATTERY and status not in ("CHARGING", "FULL")
+
+
+def _readings(snapshot):
+    total = snapshot.get("cpu_total")
+    if total:
+        cpu = total["usage"]
+    else:
+        cores = snapshot["cpu"]
+        cpu = sum(c["usage"] for c in cores) / len(cores) if cores else 0.0
+    pressure = snapshot.get("pressure") or {}
+    psi = max((lines["some"]["rate"] for lines in pressure.values()), default=0.0)
+    return cpu, psi
+
+
+def _set_source_intervals(interval):
+    """Fast sources follow the tick; the rest never sample faster than registered."""
+    base = _state["base"]
+    for name in scheduler.get_source_names():
+        registered = base.setdefault(name, scheduler.get_interval(name))
+        if registered is None:
+            continue
+        scheduler.set_interval(name, interval if name in FOLLOW_TICK else max(registered, interval))
+
+
+def next_interval(snapshot, visible=True):
+    """
+    Seconds until the next tick, given this tick's snapshot.
+
+    Drops to MIN_INTERVAL when CPU usage or a PSI stall rate jumps, then
+    stretches by BACKOFF on every stable tick up to MAX_INTERVAL. Low
+    battery (discharging) holds it at LOW_BATTERY_INTERVAL or slower, and
+    a hidden terminal parks it at MAX_INTERVAL. Collector cadences are
+    adjusted to match.
+    """
+    cpu, psi = _readings(snapshot)
+    last = _state["last"]
+    _state["last"] = (cpu, psi)
+
+    jumped = last is not None and (abs(cpu - last[0]) >= CPU_JUMP or psi - last[1] >= PSI_JUMP)
+    if jumped:
+        interval = MIN_INTERVAL
+    else:
+        interval = min(MAX_INTERVAL, _state["interval"] * BACKOFF)
+    if _battery_low(snapshot.get("battery")):
+        interval = max(interval, LOW_BATTERY_INTERVAL)
+    if not visible:
+        interval = MAX_INTERVAL
+
+    if interval != _state["interval"]:
+        _state["interval"] = interval
+        _set_source_intervals(interval)
+    return interval
+
+
+def set_shown_panels(shown):
+    """
+    Pause the sources of panels that were not drawn this frame; an empty
+    `shown` (hidden terminal) pauses them all until the next render.
+    """
+    for panel, sources in PANEL_SOURCES.items():
+        for name in sources:
+            scheduler.set_paused(name, panel not in shown)
@@ -0,0 +1,227 @@
+# agent.py - Stream delta-encoded snapshots (--agent) and follow many agents (--dashboard)
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from utils.history import Ring
+from utils.snapshot import take_snapshot
+
+DEFAULT_PORT = 9188
+
+# Snapshot fields an agent sends; enough for the minimal layout and header
+FIELDS = ("info", "cpu", "cpu_total", "load", "pressure", "mem", "storage", "temps",
+          "battery", "net", "alerts")
+_INFO_FIELDS = ("os", "kernel", "arch", "proot")
+
+# Delta markers: removed dict keys, and per-index patches of a list
+_DEL = "-"
+_IDX = "@"
+_SAME = object()
+
+_encoder = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+
+
+def parse_address(text, host="127.0.0.1"):
+    """
+    ("unix", path) or ("tcp", (host, port)) from "unix:PATH", "/PATH",
+    "PORT", "HOST:PORT" or "HOST" (DEFAULT_PORT).
+    """
+    if text.startswith("unix:"):
+        return "unix", text[5:]
+    if text.startswith("/"):
+        return "unix", text
+    if text.isdigit():
+        return "tcp", (host, int(text))
+    name, sep, port = text.rpartition(":")
+    if sep and port.isdigit():
+        return "tcp", (name.strip("[]") or host, int(port))
+    return "tcp", (text, DEFAULT_PORT)
+
+
+def _round(value):
+    """Floats to 0.1: finer changes are invisible in the panels and cost bytes."""
+    if isinstance(value, float):
+        return round(value, 1)
+    if isinstance(value, dict):
+        return {k: _round(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_round(v) for v in value]
+    return value
+
+
+def compact(snapshot):
+    """The part of a snapshot an agent sends, rounded for stable deltas."""
+    out = {}
+    for name in FIELDS:
+        out[name] = _round(snapshot.get(name))
+    out["info"] = {k: snapshot["info"].get(k) for k in _INFO_FIELDS}
+    # Counters that change every tick but are never drawn from a delta view
+    net = out["net"]
+    if net:
+        out["net"] = {k: v for k, v in net.items() if k != "interfaces"}
+    if out["alerts"]:
+        # "since" is the agent's own monotonic clock
+        out["alerts"] = [{"rule": a["rule"], "panel": a["panel"], "value": a["value"]}
+                         for a in out["alerts"]]
+    pressure = out["pressure"]
+    if pressure:
+        out["pressure"] = {
+            resource: {kind: {k: v for k, v in line.items() if k != "total_us"}
+                       for kind, line in lines.items()}
+            for resource, lines in pressure.items()
+        }
+    return out
+
+
+def diff(old, new):
+    """
+    Delta turning `old` into `new`: changed dict keys only (removed ones
+    listed under "-"), equal-length lists patched per index under "@",
+    anything else replaced. Returns _SAME when nothing changed.
+    """
+    if old == new:
+        return _SAME
+    if isinstance(old, dict) and isinstance(new, dict):
+        out = {}
+        for key, value in new.items():
+            d = diff(old[key], value) if key in old else value
+            if d is not _SAME:
+                out[key] = d
+        gone = [key for key in old if key not in new]
+        if gone:
+            out[_DEL] = gone
+        return out
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        patch = {}
+        for i, (a, b) in enumerate(zip(old, new)):
+            d = diff(a, b)
+            if d is not _SAME:
+                patch[str(i)] = d
+        return {_IDX: patch}
+    return new
+
+
+def apply(old, delta):
+    """Inverse of diff(): `old` with `delta` applied (a new object)."""
+    if isinstance(delta, dict):
+        if _IDX in delta and isinstance(old, list):
+            new = list(old)
+            for i, d in delta[_IDX].items():
+                new[int(i)] = apply(new[int(i)], d)
+            return new
+        if isinstance(old, dict):
+            new = dict(old)
+            for key in delta.get(_DEL, ()):
+                new.pop(key, None)
+            for key, d in delta.items():
+                if key != _DEL:
+                    new[key] = apply(new[key], d) if key in new else d
+            return new
+    return delta
+
+
+# ---- agent side ------------------------------------------------------------
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+    """One dashboard connection: a full snapshot, then one delta per tick."""
+
+    def handle(self):
+        sent = {}
+        interval = self.server.interval
+        deadline = time.monotonic()
+        while True:
+            snap = compact(take_snapshot())
+            delta = diff(sent, snap)
+            if delta is _SAME:
+                delta = {}
+            line = _encoder.encode({"t": round(time.time(), 1), "d": delta})
+            try:
+                self.wfile.write(line.encode() + b"\n")
+            except OSError:
+                return
+            sent = snap
+            deadline += interval
+            time.sleep(max(0.0, deadline - time.monotonic()))
+
+
+class _TCPAgent(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixAgent(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def start_agent(address, interval=1.0, host="127.0.0.1"):
+    """
+    Serve snapshots on `address` (see parse_address) from a daemon thread.
+
+    The caller must keep the scheduler running so snapshots stay fresh.
+    """
+    kind, where = parse_address(address, host)
+    if kind == "unix":
+        if os.path.exists(where):
+            # A stale socket from a previous run would make bind() fail
+            os.unlink(where)
+        server = _UnixAgent(where, _AgentHandler)
+    else:
+        server = _TCPAgent(where, _AgentHandler)
+    server.interval = interval
+    threading.Thread(target=server.serve_forever, name="agent", daemon=True).start()
+    return server
+
+
+# ---- dashboard side --------------------------------------------------------
+
+def _follow(device):
+    """Keep one agent connection alive, applying deltas into `device`."""
+    kind, where = parse_address(device["address"])
+    backoff = 1.0
+    while True:
+        try:
+            if kind == "tcp":
+                conn = socket.create_connection(where, timeout=10)
+            else:
+                conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                conn.settimeout(10)
+                conn.connect(where)
+            with conn, conn.makefile("rb") as stream:
+                state = {}
+                device["error"] = None
+                backoff = 1.0
+                for line in stream:
+                    msg = json.loads(line)
+                    state = apply(state, msg["d"])
+                    device["bytes"].append(len(line))
+                    device["snapshot"] = state
+                    device["time"] = time.monotonic()
+                raise ConnectionError("agent closed the connection")
+        except Exception as exc:
+            # A malformed or truncated delta (KeyError, IndexError, TypeError
+            # from apply) must not end the thread: reconnect for a full snapshot
+            device["error"] = str(exc) or type(exc).__name__
+        time.sleep(backoff)
+        backoff = min(10.0, backoff * 2)
+
+
+def follow_agents(addresses):
+    """
+    Connect to every agent in a daemon thread each (reconnecting with
+    backoff) and return the device dicts they keep updated: address,
+    snapshot (None until the first message), time (monotonic, of the last
+    message), error (None while connected) and bytes (recent line sizes).
+    """
+    devices = []
+    for address in addresses:
+        device = {"address": address, "snapshot": None, "time": None, "error": None,
+                  "bytes": Ring(16)}
+        threading.Thread(target=_follow, args=(device,), name=f"dash-{address}",
+                         daemon=True).start()
+        devices.append(device)
+    return devices
@@ -0,0 +1,432 @@
+# alerts.py - Threshold and rate alert rules over incrementally kept windows
+
+import os
+import re
+import subprocess
+import time
+from collections import deque
+
+from utils import scheduler
+from utils.scheduler import register_source
+
+# Default hysteresis: a rule firing above/below T clears only once the value
+# is this fraction of |T| back on the other side (override with "clear X")
+HYSTERESIS = 0.05
+# Window used by rising/falling rules that give no "for" duration
+RATE_WINDOW = 5.0
+
+_DURATION_UNITS = {None: 1, "s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600}
+
+# [agg] METRIC [agg|rising|falling] [on NAME] OP VALUE[unit] [for N[s|m|h]] [on NAME] [clear X[unit]]
+_RULE = re.compile(r"""
+    ^\s*(?:(?P<agg1>avg|min|max)\s+)?
+    (?P<metric>[a-z_]+)
+    (?:\s+(?P<agg2>avg|min|max|rising|falling))?
+    (?:\s+on\s+(?P<on1>\S+))?
+    \s*(?P<op>>=|<=|==|>|<)\s*
+    (?P<value>-?\d+(?:\.\d+)?)(?:\s*(?!for\b|on\b|clear\b)(?P<vunit>[^\s\d]\S*))?
+    (?:\s+for\s+(?P<span>\d+(?:\.\d+)?)\s*(?P<unit>s|sec|min|m|h)?)?
+    (?:\s+on\s+(?P<on2>\S+))?
+    (?:\s+clear\s+(?P<clear>-?\d+(?:\.\d+)?)(?:\s*(?P<cunit>[^\s\d]\S*))?)?
+    \s*$""", re.X)
+
+# Wordings accepted for a metric name, rewritten before matching
+_ALIASES = (
+    (re.compile(r"^(\s*(?:(?:avg|min|max)\s+)?)thermal[ _]zones?\b"), r"\1temp"),
+    (re.compile(r"^(\s*(?:(?:avg|min|max)\s+)?)net\s+(?=[rt]x_speed\b)"), r"\1"),
+)
+
+# Unit written after a value -> (dimension, size in the dimension's base unit);
+# a trailing "/s" makes it a per-second rate of that unit
+_UNITS = {
+    "%": ("percent", 1.0),
+    "°c": ("temp", 1.0), "°": ("temp", 1.0), "c": ("temp", 1.0),
+    "b": ("size", 1.0), "kb": ("size", 1024.0), "mb": ("size", 1024.0 ** 2),
+    "gb": ("size", 1024.0 ** 3), "kib": ("size", 1024.0), "mib": ("size", 1024.0 ** 2),
+    "gib": ("size", 1024.0 ** 3),
+    "us": ("time", 1e-6), "ms": ("time", 1e-3), "s": ("time", 1.0),
+}
+
+
+def _pick(items, target, key, field):
+    """`field` of the item named `target`, or the largest one when no target is given."""
+    if target is None:
+        return max((item[field] for item in items), default=None)
+    for item in items:
+        if item[key] == target:
+            return item[field]
+    return None
+
+
+def _named(mapping, target, field, total=None):
+    """`field` of mapping[target]; without a target `total`, or else the largest entry."""
+    if target is None:
+        if total is not None:
+            return total
+        return max((entry[field] for entry in mapping.values()), default=None)
+    entry = mapping.get(target)
+    return entry[field] if entry else None
+
+
+def _cores(cpu, target):
+    cores = [dict(core, index=str(i)) for i, core in enumerate(cpu or [])]
+    return _pick(cores, target, "index", "usage")
+
+
+def _psi(pressure, target):
+    if not pressure:
+        return None
+    lines = [{"name": name, "rate": kinds["some"]["rate"]} for name, kinds in pressure.items()]
+    return _pick(lines, target, "name", "rate")
+
+
+def _throttled(clusters, target):
+    """Throttled clusters, or 1/0 for the cluster named (policy or label) `target`."""
+    if not clusters:
+        return None
+    return sum(1 for cl in clusters["clusters"]
+               if cl["throttled"] and target in (None, cl["name"], cl["label"]))
+
+
+def _swap_percent(mem):
+    if not mem.get("swap_total"):
+        return None
+    return mem["swap_used"] / mem["swap_total"] * 100
+
+
+# metric -> (source, panel it is shown in, value(source value, target)),
+# in the units the panels use (%, MB, MB/s, KB/s, ms, °C)
+METRICS = {
+    "cpu": ("cpu_total", "cpu", lambda v, t: v and v["usage"]),
+    "iowait": ("cpu_total", "cpu", lambda v, t: v and v["times"]["iowait"]),
+    "steal": ("cpu_total", "cpu", lambda v, t: v and v["times"]["steal"]),
+    "core": ("cpu", "cpu", _cores),
+    "load": ("load", "cpu", lambda v, t: v and v["load1"]),
+    "psi": ("pressure", "cpu", _psi),
+    "throttled": ("clusters", "cpu", _throttled),
+    "mem": ("mem", "resources", lambda v, t: v and v["percent"]),
+    "mem_used": ("mem", "resources", lambda v, t: v and v["used"]),
+    "swap": ("mem", "resources", lambda v, t: v and _swap_percent(v)),
+    "swap_used": ("mem", "resources", lambda v, t: v and v.get("swap_used")),
+    "storage": ("storage", "resources", lambda v, t: v and v["percent"]),
+    "disk_read": ("disk_io", "resources", lambda v, t: v and _named(v["devices"], t, "read_speed", v["read_speed"])),
+    "disk_write": ("disk_io", "resources", lambda v, t: v and _named(v["devices"], t, "write_speed", v["write_speed"])),
+    "disk_util": ("disk_io", "resources", lambda v, t: v and _named(v["devices"], t, "util")),
+    "disk_latency": ("disk_io", "resources", lambda v, t: v and _named(v["devices"], t, "latency_ms")),
+    "temp": ("temps", "sensors", lambda v, t: _pick(v or [], t, "name", "temp")),
+    "battery": ("battery", "sensors", lambda v, t: v and v["level"]),
+    "battery_temp": ("battery", "sensors", lambda v, t: v and v["temp"]),
+    "rx_speed": ("net", "network", lambda v, t: v and _named(v["interfaces"], t, "rx_speed", v["rx_speed"])),
+    "tx_speed": ("net", "network", lambda v, t: v and _named(v["interfaces"], t, "tx_speed", v["tx_speed"])),
+    "net_errors": ("net", "network", lambda v, t: v and _named(v["interfaces"], t, "new_errors")),
+    "net_drops": ("net", "network", lambda v, t: v and _named(v["interfaces"], t, "new_drops")),
+}
+
+
+# Unit each metric is measured in (None: a plain count or ratio)
+METRIC_UNITS = {
+    "cpu": "%", "iowait": "%", "steal": "%", "core": "%", "load": None, "psi": "%",
+    "throttled": None, "mem": "%", "mem_used": "MB", "swap": "%", "swap_used": "MB",
+    "storage": "%", "disk_read": "MB/s", "disk_write": "MB/s", "disk_util": "%",
+    "disk_latency": "ms", "temp": "°C", "battery": "%", "battery_temp": "°C",
+    "rx_speed": "KB/s", "tx_speed": "KB/s", "net_errors": None, "net_drops": None,
+}
+
+
+def _unit(text):
+    """(dimension, scale) of a unit such as "MB", "KB/s" or "°C"; None if unknown."""
+    text = text.lower()
+    rate = text.endswith("/s")
+    if rate:
+        text = text[:-2]
+    if text not in _UNITS:
+        return None
+    dim, scale = _UNITS[text]
+    return (dim + "/s", scale) if rate else (dim, scale)
+
+
+def _convert(value, unit, metric, agg, rule):
+    """`value` written in `unit` (may be None), in the unit the rule compares."""
+    if unit is None:
+        return value
+    expected = METRIC_UNITS[metric]
+    if expected is not None and agg in ("rising", "falling"):
+        expected = None if expected.endswith("/s") else expected + "/s"
+    given = _unit(unit)
+    if given is None:
+        raise ValueError(f"unknown unit {unit!r} in alert rule: {rule!r}")
+    if expected is None or _unit(expected)[0] != given[0]:
+        raise ValueError(f"unit {unit!r} does not fit {metric} "
+                         f"(measured in {expected or 'plain numbers'}) in alert rule: {rule!r}")
+    return value * given[1] / _unit(expected)[1]
+
+
+class Window:
+    """
+    Samples of one metric covering the last `span` seconds.
+
+    Min and max come from monotonic deques and the mean from a running
+    sum, so a push costs O(1) amortised and reading an aggregate O(1),
+    however long the window. The newest sample at or before the window's
+    start is kept as an anchor: it is what held when the window opened,
+    and it tells whether the window is fully covered yet.
+    """
+
+    __slots__ = ("span", "_samples", "_min", "_max", "_sum")
+
+    def __init__(self, span):
+        self.span = span
+        self._samples = deque()
+        self._min = deque()
+        self._max = deque()
+        self._sum = 0.0
+
+    def push(self, t, value):
+        samples = self._samples
+        samples.append((t, value))
+        self._sum += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((t, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((t, value))
+
+        edge = t - self.span
+        while len(samples) > 1 and samples[1][0] <= edge:
+            self._sum -= samples.popleft()[1]
+        first = samples[0][0]
+        while self._min[0][0] < first:
+            self._min.popleft()
+        while self._max[0][0] < first:
+            self._max.popleft()
+
+    @property
+    def ready(self):
+        """Whether the samples reach back the whole span."""
+        return bool(self._samples) and self._samples[0][0] <= self._samples[-1][0] - self.span
+
+    def min(self):
+        return self._min[0][1]
+
+    def max(self):
+        return self._max[0][1]
+
+    def avg(self):
+        return self._sum / len(self._samples)
+
+    def rate(self):
+        """Change per second from the oldest to the newest sample."""
+        (t0, v0), (t1, v1) = self._samples[0], self._samples[-1]
+        return (v1 - v0) / (t1 - t0) if t1 > t0 else 0.0
+
+
+_state = {
+    "rules": [],
+    # (metric, target) -> {"source", "extract", "target", "stamp", "windows", "rules"}
+    "feeds": {},
+    "log": None,
+    "command": None,
+    # Running action commands, reaped as they exit
+    "children": [],
+}
+
+
+def parse_rule(text):
+    """
+    Rule dict from text like "cpu avg > 90% for 30s",
+    "swap_used rising > 10 MB/s", "temp on battery > 75°C clear 70"
+    or "rx_speed == 0 for 60s on wlan0". Values written with a unit are
+    converted to the metric's own (METRIC_UNITS), and a unit of another
+    kind is rejected. Raises ValueError.
+    """
+    normalized = text
+    for pattern, replacement in _ALIASES:
+        normalized = pattern.sub(replacement, normalized)
+    m = _RULE.match(normalized)
+    if not m:
+        raise ValueError(f"cannot parse alert rule: {text!r}")
+    metric = m["metric"]
+    if metric not in METRICS:
+        raise ValueError(f"unknown metric {metric!r} in alert rule {text!r} "
+                         f"(known: {', '.join(sorted(METRICS))})")
+    if m["agg1"] and m["agg2"]:
+        raise ValueError(f"two aggregates in alert rule: {text!r}")
+    if m["on1"] and m["on2"]:
+        raise ValueError(f"two targets in alert rule: {text!r}")
+    agg = m["agg1"] or m["agg2"]
+    op = m["op"]
+    threshold = _convert(float(m["value"]), m["vunit"], metric, agg, text)
+    span = float(m["span"] or 0) * _DURATION_UNITS[m["unit"]]
+    if agg in ("rising", "falling") and not span:
+        span = RATE_WINDOW
+    if m["clear"] is not None:
+        clear = _convert(float(m["clear"]), m["cunit"], metric, agg, text)
+        if op != "==" and (clear > threshold if op[0] == ">" else clear < threshold):
+            raise ValueError(f"clear level is past the threshold in alert rule: {text!r}")
+    else:
+        margin = abs(threshold) * HYSTERESIS
+        clear = threshold - margin if op[0] == ">" else threshold + margin
+    return {
+        "text": " ".join(text.split()),
+        "metric": metric,
+        "target": m["on1"] or m["on2"],
+        "agg": agg,
+        "op": op,
+        "threshold": threshold,
+        "clear": clear,
+        "span": span,
+        "panel": METRICS[metric][1],
+        "firing": False,
+        "since": None,
+        "value": None,
+    }
+
+
+def load_rules(path):
+    """Rule texts from a file: one per line, blank lines and # comments skipped."""
+    with open(path) as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+def set_rules(texts, log=None, command=None):
+    """
+    Replace the alert rules (parsed from `texts`) and actions.
+
+    Every firing rule highlights its panel; with `log`, transitions are
+    appended to that file, and with `command`, it is run through the
+    shell with TSM_ALERT, TSM_ALERT_STATE and TSM_ALERT_VALUE set.
+    Rules on the same metric and target share one sample feed, and rules
+    with equal windows share the window.
+    """
+    rules = [parse_rule(text) for text in texts]
+    feeds = {}
+    for rule in rules:
+        key = (rule["metric"], rule["target"])
+        feed = feeds.get(key)
+        if feed is None:
+            source, _, extract = METRICS[rule["metric"]]
+            feed = feeds[key] = {"source": source, "extract": extract, "target": rule["target"],
+                                 "stamp": None, "windows": {}, "rules": []}
+        window = feed["windows"].get(rule["span"])
+        if window is None:
+            window = feed["windows"][rule["span"]] = Window(rule["span"])
+        rule["window"] = window
+        feed["rules"].append(rule)
+    _state.update({"rules": rules, "feeds": feeds, "log": log, "command": command})
+
+
+def _aggregate(rule):
+    """The value a rule compares: its aggregate, or min/max for "held for" rules."""
+    window = rule["window"]
+    agg = rule["agg"]
+    if agg == "rising":
+        return window.rate()
+    if agg == "falling":
+        return -window.rate()
+    if agg:
+        return getattr(window, agg)()
+    return None
+
+
+def _check(rule, value):
+    """
+    (fire, clear) for the rule's current window. Plain rules fire when
+    every sample in the window is past the threshold and clear when every
+    one is back past the clear level, so neither edge flaps.
+    """
+    op, threshold, clear = rule["op"], rule["threshold"], rule["clear"]
+    if value is None:
+        lo, hi = rule["window"].min(), rule["window"].max()
+        if op == "==":
+            held = lo == hi == threshold
+            return held, not held
+        if op == ">":
+            return lo > threshold, hi <= clear
+        if op == ">=":
+            return lo >= threshold, hi < clear
+        if op == "<":
+            return hi < threshold, lo >= clear
+        return hi <= threshold, lo > clear
+    if op == "==":
+        return value == threshold, value != threshold
+    if op == ">":
+        return value > threshold, value <= clear
+    if op == ">=":
+        return value >= threshold, value < clear
+    if op == "<":
+        return value < threshold, value >= clear
+    return value <= threshold, value > clear
+
+
+def _notify(rule, state):
+    value = rule["value"]
+    if _state["log"]:
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        try:
+            with open(_state["log"], "a") as f:
+                f.write(f"{stamp} {state} {rule['text']} value={value:.2f}\n")
+        except OSError:
+            pass
+    if _state["command"]:
+        env = dict(os.environ, TSM_ALERT=rule["text"], TSM_ALERT_STATE=state,
+                   TSM_ALERT_VALUE=f"{value:.2f}")
+        try:
+            _state["children"].append(subprocess.Popen(
+                _state["command"], shell=True, env=env, start_new_session=True,
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            ))
+        except OSError:
+            pass
+
+
+def _evaluate(rule, now, latest):
+    if not rule["window"].ready:
+        return
+    value = _aggregate(rule)
+    fire, clear = _check(rule, value)
+    rule["value"] = latest if value is None else value
+    if not rule["firing"] and fire:
+        rule.update({"firing": True, "since": now})
+        _notify(rule, "FIRING")
+    elif rule["firing"] and clear:
+        rule.update({"firing": False, "since": None})
+        _notify(rule, "RESOLVED")
+
+
+@register_source("alerts", 0.5)
+def check_alerts():
+    """
+    Feed new samples into the rule windows and evaluate affected rules.
+
+    Only metrics whose source has a new sample are read, and only their
+    rules are evaluated, so the cost per tick does not grow with history
+    and stays small for thousands of rules. Returns the firing rules
+    ({rule, panel, value, since}, oldest first), or None without rules.
+    """
+    if not _state["rules"]:
+        return None
+    for feed in _state["feeds"].values():
+        stamp = scheduler.get_sample_time(feed["source"])
+        if stamp is None or stamp == feed["stamp"]:
+            continue
+        feed["stamp"] = stamp
+        value = feed["extract"](scheduler.get_latest(feed["source"]), feed["target"])
+        if value is None:
+            continue
+        for window in feed["windows"].values():
+            window.push(stamp, value)
+        for rule in feed["rules"]:
+            _evaluate(rule, stamp, value)
+
+    children = _state["children"]
+    if children:
+        children[:] = [p for p in children if p.poll() is None]
+
+    firing = [rule for rule in _state["rules"] if rule["firing"]]
+    firing.sort(key=lambda rule: rule["since"])
+    return [
+        {"rule": rule["text"], "panel": rule["panel"], "value": rule["value"], "since": rule["since"]}
+        for rule in firing
+    ]
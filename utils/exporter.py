@@ -0,0 +1,221 @@
+# exporter.py - Prometheus/OpenMetrics text exposition of the latest snapshot
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.snapshot import take_snapshot
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_MB = 1024 ** 2
+_GB = 1024 ** 3
+
+_lock = threading.Lock()
+# (sample stamps, encoded exposition) of the last rendered snapshot
+_cache = (None, b"")
+
+
+def _esc(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value):
+    # Integers (byte counters) are kept exact; floats use shortest repr
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class _Builder:
+    """Collects samples grouped by metric family."""
+
+    def __init__(self):
+        self._lines = []
+
+    def family(self, name, mtype, help_text):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {mtype}")
+
+    def sample(self, name, value, **labels):
+        if labels:
+            label_str = ",".join(f'{k}="{_esc(v)}"' for k, v in labels.items())
+            self._lines.append(f"{name}{{{label_str}}} {_num(value)}")
+        else:
+            self._lines.append(f"{name} {_num(value)}")
+
+    def encode(self):
+        return ("\n".join(self._lines) + "\n").encode()
+
+
+def render_metrics(snapshot):
+    """Prometheus text exposition for one snapshot."""
+    b = _Builder()
+
+    cores = snapshot["cpu"]
+    b.family("tsm_cpu_usage_percent", "gauge", "Per-core busy percentage")
+    for c in cores:
+        b.sample("tsm_cpu_usage_percent", c["usage"], cpu=c["id"], source=c["usage_src"])
+    total = snapshot.get("cpu_total")
+    if total:
+        b.family("tsm_cpu_time_percent", "gauge", "Share of all CPU time per category")
+        for mode, pct in total["times"].items():
+            b.sample("tsm_cpu_time_percent", pct, mode=mode)
+    b.family("tsm_cpu_frequency_mhz", "gauge", "Current per-core frequency")
+    for c in cores:
+        b.sample("tsm_cpu_frequency_mhz", c["cur"], cpu=c["id"])
+    b.family("tsm_cpu_max_frequency_mhz", "gauge", "Maximum per-core frequency")
+    for c in cores:
+        b.sample("tsm_cpu_max_frequency_mhz", c["max"], cpu=c["id"])
+    clusters = (snapshot.get("clusters") or {}).get("clusters")
+    if clusters:
+        b.family("tsm_cpu_cluster_limit_mhz", "gauge", "scaling_max_freq cap per cpufreq policy")
+        for cl in clusters:
+            b.sample("tsm_cpu_cluster_limit_mhz", cl["limit"], cluster=cl["name"], label=cl["label"])
+        b.family("tsm_cpu_cluster_throttled", "gauge", "1 if the policy was capped while temperatures rose")
+        for cl in clusters:
+            b.sample("tsm_cpu_cluster_throttled", 1 if cl["throttled"] else 0, cluster=cl["name"], label=cl["label"])
+
+    load = snapshot["load"]
+    if load:
+        b.family("tsm_load_average", "gauge", "System load average")
+        for period in ("1", "5", "15"):
+            b.sample("tsm_load_average", load[f"load{period}"], period=period)
+        b.family("tsm_processes_running", "gauge", "Runnable scheduling entities")
+        b.sample("tsm_processes_running", load["running"])
+        b.family("tsm_processes_total", "gauge", "Existing scheduling entities")
+        b.sample("tsm_processes_total", load["total"])
+
+    mem = snapshot["mem"]
+    b.family("tsm_memory_bytes", "gauge", "Memory usage")
+    for kind in ("used", "total", "buffers", "cached"):
+        b.sample("tsm_memory_bytes", mem[kind] * _MB, kind=kind)
+    if mem.get("swap_total", 0) > 0:
+        b.family("tsm_swap_bytes", "gauge", "Swap usage")
+        for kind in ("used", "total", "free"):
+            b.sample("tsm_swap_bytes", mem[f"swap_{kind}"] * _MB, kind=kind)
+
+    pressure = snapshot.get("pressure")
+    if pressure:
+        b.family("tsm_pressure_stalled_seconds_total", "counter",
+                 "Time some or all tasks stalled on a resource (PSI)")
+        for resource, lines in pressure.items():
+            for kind, line in lines.items():
+                b.sample("tsm_pressure_stalled_seconds_total", line["total_us"] / 1e6,
+                         resource=resource, kind=kind)
+
+    storage = snapshot["storage"]
+    b.family("tsm_storage_bytes", "gauge", "Root filesystem usage")
+    b.sample("tsm_storage_bytes", storage["used"] * _GB, kind="used")
+    b.sample("tsm_storage_bytes", storage["total"] * _GB, kind="total")
+
+    disk_io = snapshot["disk_io"]
+    if disk_io and "read_bytes" in disk_io:
+        b.family("tsm_disk_read_bytes_total", "counter", "Bytes read from block devices")
+        b.sample("tsm_disk_read_bytes_total", disk_io["read_bytes"])
+        b.family("tsm_disk_written_bytes_total", "counter", "Bytes written to block devices")
+        b.sample("tsm_disk_written_bytes_total", disk_io["write_bytes"])
+
+    interfaces = snapshot["net"].get("interfaces") or {}
+    b.family("tsm_network_receive_bytes_total", "counter", "Bytes received per interface")
+    for iface, data in interfaces.items():
+        b.sample("tsm_network_receive_bytes_total", data["rx"], interface=iface)
+    b.family("tsm_network_transmit_bytes_total", "counter", "Bytes sent per interface")
+    for iface, data in interfaces.items():
+        b.sample("tsm_network_transmit_bytes_total", data["tx"], interface=iface)
+    if any("errors" in data for data in interfaces.values()):
+        b.family("tsm_network_errors_total", "counter", "Receive + transmit errors per interface")
+        for iface, data in interfaces.items():
+            b.sample("tsm_network_errors_total", data.get("errors", 0), interface=iface)
+        b.family("tsm_network_drops_total", "counter", "Receive + transmit drops per interface")
+        for iface, data in interfaces.items():
+            b.sample("tsm_network_drops_total", data.get("drops", 0), interface=iface)
+        b.family("tsm_network_up", "gauge", "1 if the interface operstate is up")
+        for iface, data in interfaces.items():
+            b.sample("tsm_network_up", 1 if data.get("state") == "up" else 0, interface=iface)
+
+    temps = snapshot["temps"]
+    if temps:
+        b.family("tsm_temperature_celsius", "gauge", "Thermal zone temperature")
+        for t in temps:
+            # Several zones may share a type name; the zone number keeps series distinct
+            b.sample("tsm_temperature_celsius", t["temp"], type=t["name"], zone=t.get("zone", ""))
+
+    battery = snapshot["battery"]
+    if battery:
+        b.family("tsm_battery_level_percent", "gauge", "Battery charge")
+        b.sample("tsm_battery_level_percent", battery["level"])
+        b.family("tsm_battery_temperature_celsius", "gauge", "Battery temperature")
+        b.sample("tsm_battery_temperature_celsius", battery.get("temp", 0) or 0)
+        b.family("tsm_battery_stale", "gauge", "1 if the battery reading is overdue")
+        b.sample("tsm_battery_stale", 1 if battery.get("stale") else 0)
+
+    firing = snapshot.get("alerts")
+    if firing is not None:
+        b.family("tsm_alerts_firing", "gauge", "Alert rules currently firing")
+        b.sample("tsm_alerts_firing", len(firing))
+        if firing:
+            b.family("tsm_alert_value", "gauge", "Compared value of each firing alert rule")
+            for alert in firing:
+                b.sample("tsm_alert_value", alert["value"], rule=alert["rule"])
+
+    monitor = snapshot.get("monitor") or {}
+    if monitor.get("rss_mb") is not None:
+        b.family("tsm_monitor_rss_bytes", "gauge", "Resident memory of the monitor itself")
+        b.sample("tsm_monitor_rss_bytes", monitor["rss_mb"] * _MB)
+    if monitor.get("cpu") is not None:
+        b.family("tsm_monitor_cpu_percent", "gauge", "CPU used by the monitor (% of one core)")
+        b.sample("tsm_monitor_cpu_percent", monitor["cpu"])
+    if monitor.get("collectors"):
+        b.family("tsm_monitor_collector_seconds", "gauge", "Duration of the latest collector run")
+        for name, ms in monitor["collectors"].items():
+            b.sample("tsm_monitor_collector_seconds", ms / 1000.0, collector=name)
+
+    return b.encode()
+
+
+def get_metrics():
+    """
+    Exposition of the latest sampled snapshot.
+
+    Reads only the scheduler cache, and re-encodes only when some source
+    has produced a new sample, so any number of scrapes between samples
+    share one rendering and never touch /proc.
+    """
+    global _cache
+    snapshot = take_snapshot()
+    key = tuple(snapshot["stamps"].values())
+    with _lock:
+        if _cache[0] != key:
+            _cache = (key, render_metrics(snapshot))
+        return _cache[1]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_exporter(port, host="127.0.0.1"):
+    """
+    Serve /metrics on (host, port) from a daemon thread.
+
+    Port 0 picks a free port; the bound address is in server.server_address.
+    The caller must keep the scheduler running so snapshots stay fresh.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="exporter", daemon=True).start()
+    return server
@@ -0,0 +1,182 @@
+# graph.py - Incremental Braille history graphs (2x4 dots per character cell)
+
+from collections import deque
+
+# Bottom-up fill masks for the left and right dot columns of a Braille cell,
+# indexed by how many of its 4 dot rows are lit
+_LEFT = (0x00, 0x40, 0x44, 0x46, 0x47)
+_RIGHT = (0x00, 0x80, 0xA0, 0xB0, 0xB8)
+_BLANK = chr(0x2800)
+
+# metric name -> BrailleGraph kept between frames
+_graphs = {}
+
+
+def _nice_ceiling(value, floor):
+    """Smallest 1/2/5 x 10^k that is >= value (and >= floor)."""
+    if value <= floor:
+        return floor
+    step = 1.0
+    while step * 10 < value:
+        step *= 10
+    while step > value:
+        step /= 10
+    for mult in (1, 2, 5, 10):
+        if step * mult >= value:
+            return step * mult
+    return step * 10
+
+
+class BrailleGraph:
+    """
+    Scrolling graph of one metric, `width` cells wide and `rows` cells high.
+
+    Every cell holds two samples side by side with four dot rows each, so
+    a graph shows 2*width samples at 4*rows levels. Cells are cached as
+    they are drawn: a new sample either completes the newest cell or
+    starts one (dropping the oldest), and nothing else is recomputed.
+
+    The scale is fixed when `hi` is given (e.g. 0-100 for percentages).
+    Otherwise it is a 1/2/5 ceiling that rises as soon as a sample exceeds
+    it and falls only when the visible window drops below a quarter of it;
+    only those rescales redraw every cell.
+    """
+
+    __slots__ = ("width", "rows", "lo", "hi", "_auto", "_floor",
+                 "_samples", "_cells", "_half", "_seen", "_text")
+
+    def __init__(self, width, rows=1, lo=0.0, hi=None, floor=1.0):
+        self.width = max(1, width)
+        self.rows = max(1, rows)
+        self.lo = lo
+        self._auto = hi is None
+        self._floor = floor
+        self.hi = floor if hi is None else hi
+        self._samples = deque(maxlen=2 * self.width)
+        # One tuple of row characters (top first) per cell, oldest first
+        self._cells = deque(maxlen=self.width)
+        self._half = False  # newest cell has only its left column filled
+        self._seen = 0
+        self._text = None
+
+    def _level(self, value):
+        span = self.hi - self.lo
+        if span <= 0 or value <= self.lo:
+            return 0
+        levels = 4 * self.rows
+        # Anything above the floor shows at least one dot
+        return max(1, min(levels, round((value - self.lo) / span * levels)))
+
+    def _cell(self, left, right):
+        a = self._level(left)
+        b = self._level(right) if right is not None else 0
+        out = []
+        for row in range(self.rows - 1, -1, -1):
+            base = 4 * row
+            la = min(4, max(0, a - base))
+            lb = min(4, max(0, b - base))
+            out.append(chr(0x2800 | _LEFT[la] | _RIGHT[lb]))
+        return tuple(out)
+
+    def _redraw(self):
+        """Rebuild every cell from the retained samples (after a rescale)."""
+        samples = list(self._samples)
+        cells = []
+        end = len(samples)
+        if self._half and end:
+            cells.append(self._cell(samples[-1], None))
+            end -= 1
+        while end >= 2 and len(cells) < self.width:
+            cells.append(self._cell(samples[end - 2], samples[end - 1]))
+            end -= 2
+        cells.reverse()
+        self._cells.clear()
+        self._cells.extend(cells)
+
+    def push(self, value):
+        """Add one sample, drawing only the cell it lands in."""
+        self._samples.append(value)
+        self._text = None
+        if self._auto:
+            if value > self.hi:
+                self.hi = _nice_ceiling(value, self._floor)
+                self._half = not self._half
+                self._redraw()
+                return
+            if not self._half and self.hi > self._floor:
+                # Only look for a smaller scale when starting a new cell
+                peak = max(self._samples)
+                if peak < self.hi / 4:
+                    self.hi = _nice_ceiling(peak, self._floor)
+                    self._half = True
+                    self._redraw()
+                    return
+        if self._half:
+            self._cells[-1] = self._cell(self._samples[-2], value)
+            self._half = False
+        else:
+            self._cells.append(self._cell(value, None))
+            self._half = True
+
+    def sync(self, ring, count):
+        """
+        Push whatever `ring` gained since the last call; `count` is how
+        many values were ever appended to it (Series.count, _Tier.count).
+        """
+        new = count - self._seen
+        if new == 0:
+            return
+        if new < 0 or new >= 2 * self.width:
+            # Series was replaced, or everything visible is new anyway
+            self._samples.clear()
+            self._cells.clear()
+            self._half = False
+            new = 2 * self.width
+        for value in ring.tail(new):
+            self.push(value)
+        self._seen = count
+
+    def render(self):
+        """Rows joined by newlines, right-aligned to `width` cells."""
+        if self._text is None:
+            pad = _BLANK * (self.width - len(self._cells))
+            self._text = "\n".join(
+                pad + "".join(cell[row] for cell in self._cells)
+                for row in range(self.rows)
+            )
+        return self._text
+
+
+def braille_graph(history, name, width, rows=1, lo=0.0, hi=None, floor=1.0, bucket=None):
+    """
+    Braille graph of history series `name`, kept up to date incrementally.
+
+    With `bucket`, the series' tier of `bucket`-second averages is drawn
+    instead of its raw samples, for trends longer than the raw depth.
+
+    One graph is cached per metric (and tier); it is recreated only when
+    its size or scale settings change. Returns "" if there is no such
+    series or tier, or the tier has no completed bucket yet.
+    """
+    series = history.get(name) if history else None
+    if not series:
+        return ""
+    if bucket is None:
+        ring, count, key = series.raw, series.count, name
+    else:
+        tier = series.tier(bucket)
+        if tier is None or not tier.avg:
+            return ""
+        ring, count, key = tier.avg, tier.count, (name, bucket)
+    graph = _graphs.get(key)
+    if (
+        graph is None
+        or graph.width != width
+        or graph.rows != rows
+        or graph.lo != lo
+        or (hi is not None and graph.hi != hi)
+        or (hi is None) != graph._auto
+    ):
+        graph = _graphs[key] = BrailleGraph(width, rows, lo, hi, floor)
+    graph.sync(ring, count)
+    return graph.render()
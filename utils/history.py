@@ -0,0 +1,157 @@
+# history.py - Fixed-size numeric ring buffers with downsampled tiers
+
+import time
+from array import array
+
+# Default number of raw samples kept per metric
+DEFAULT_DEPTH = 120
+
+# Downsampled tiers: (bucket seconds, buckets kept, keep min/max too)
+# 10 s averages for an hour, 1 min min/avg/max for a day
+DEFAULT_TIERS = ((10, 360, False), (60, 1440, True))
+
+
+class Ring:
+    """Fixed-capacity float ring buffer backed by array('f')."""
+
+    __slots__ = ("_buf", "_head", "_len")
+
+    def __init__(self, size):
+        self._buf = array("f", bytes(4 * max(1, size)))
+        self._head = 0  # next write position
+        self._len = 0
+
+    @property
+    def capacity(self):
+        return len(self._buf)
+
+    def append(self, value):
+        self._buf[self._head] = value
+        self._head = (self._head + 1) % len(self._buf)
+        if self._len < len(self._buf):
+            self._len += 1
+
+    def tolist(self):
+        """Values oldest first."""
+        if self._len < len(self._buf):
+            return self._buf[: self._len].tolist()
+        return (self._buf[self._head:] + self._buf[: self._head]).tolist()
+
+    def tail(self, n):
+        """The most recent `n` values (fewer if not yet filled), oldest first."""
+        n = min(n, self._len)
+        if n <= 0:
+            return []
+        start = (self._head - n) % len(self._buf)
+        if start < self._head:
+            return self._buf[start:self._head].tolist()
+        return (self._buf[start:] + self._buf[: self._head]).tolist()
+
+    def last(self, default=None):
+        if self._len == 0:
+            return default
+        return self._buf[self._head - 1]
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __bool__(self):
+        return self._len > 0
+
+
+class _Tier:
+    """
+    Aggregates raw samples into fixed time buckets. `count` is the number
+    of buckets completed so far; the one still filling is not in the rings.
+    """
+
+    __slots__ = ("bucket", "avg", "min", "max", "count", "_key", "_sum", "_n", "_lo", "_hi")
+
+    def __init__(self, bucket, size, minmax):
+        self.bucket = bucket
+        self.avg = Ring(size)
+        self.min = Ring(size) if minmax else None
+        self.max = Ring(size) if minmax else None
+        self.count = 0
+        self._key = None
+        self._sum = 0.0
+        self._n = 0
+        self._lo = 0.0
+        self._hi = 0.0
+
+    def add(self, value, now):
+        key = int(now // self.bucket)
+        if key != self._key:
+            self._flush()
+            self._key = key
+        if self._n == 0:
+            self._lo = self._hi = value
+        elif value < self._lo:
+            self._lo = value
+        elif value > self._hi:
+            self._hi = value
+        self._sum += value
+        self._n += 1
+
+    def _flush(self):
+        if self._n == 0:
+            return
+        self.avg.append(self._sum / self._n)
+        if self.min is not None:
+            self.min.append(self._lo)
+            self.max.append(self._hi)
+        self.count += 1
+        self._sum = 0.0
+        self._n = 0
+
+
+class Series:
+    """
+    History of one metric: a raw ring plus downsampled tiers.
+
+    Iterating a Series yields the raw samples oldest first, so it can be
+    passed anywhere a sequence of recent values is expected. `count` is
+    the number of samples ever appended, so readers can tell how many are
+    new since they last looked.
+    """
+
+    __slots__ = ("raw", "tiers", "count")
+
+    def __init__(self, depth=DEFAULT_DEPTH, tiers=DEFAULT_TIERS):
+        self.raw = Ring(depth)
+        self.tiers = [_Tier(bucket, size, minmax) for bucket, size, minmax in tiers]
+        self.count = 0
+
+    def append(self, value, now=None):
+        if now is None:
+            now = time.monotonic()
+        self.raw.append(value)
+        self.count += 1
+        for tier in self.tiers:
+            tier.add(value, now)
+
+    def tier(self, bucket):
+        """The tier aggregating `bucket`-second windows, or None."""
+        for t in self.tiers:
+            if t.bucket == bucket:
+                return t
+        return None
+
+    def resize(self, depth):
+        """Change the raw depth, keeping the most recent samples."""
+        old = self.raw.tolist()
+        self.raw = Ring(depth)
+        for v in old[-depth:]:
+            self.raw.append(v)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __bool__(self):
+        return bool(self.raw)
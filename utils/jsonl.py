@@ -0,0 +1,60 @@
+# jsonl.py - Headless JSON-lines output, one compact object per tick (no Rich)
+
+import json
+import os
+import sys
+import time
+
+from utils import scheduler
+from utils.snapshot import take_snapshot
+from utils.selfstat import mark_tick
+
+# Sources that should be sampled at least as often as lines are written
+FAST_SOURCES = ("cpu", "mem", "disk_io", "net", "load")
+
+# Fields copied from the snapshot into every line
+FIELDS = ("cpu", "cpu_total", "clusters", "load", "pressure", "mem", "storage", "disk_io", "net", "temps", "battery",
+          "procs", "threads", "alerts", "monitor")
+
+_encoder = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+
+
+def run_jsonl(interval=1.0, out=None):
+    """
+    Write one JSON object per tick to `out` (stdout) until interrupted.
+
+    Sampling happens inline on this thread, so each line is a consistent
+    snapshot. Each line is encoded in one call of a preconfigured encoder
+    (the C one-shot path; iterencode() goes through Python per chunk and
+    is several times slower) and written without joining the newline on.
+    """
+    out = out or sys.stdout
+    for name in FAST_SOURCES:
+        current = scheduler.get_interval(name)
+        if current is not None and current > interval:
+            scheduler.set_interval(name, interval)
+
+    line = {"t": 0.0}
+    deadline = time.monotonic()
+    try:
+        while True:
+            mark_tick(interval)
+            snapshot = take_snapshot()
+            line["t"] = round(time.time(), 3)
+            for field in FIELDS:
+                line[field] = snapshot[field]
+            out.write(_encoder.encode(line))
+            out.write("\n")
+            out.flush()
+
+            # Fixed-rate schedule: late ticks shorten the next sleep
+            deadline += interval
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.monotonic()
+    except BrokenPipeError:
+        # Reader went away (e.g. `| head`); silence the final flush at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, out.fileno())
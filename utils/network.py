@@ -1,40 +1,86 @@
+import re
 import time
 from utils.utils import get_state
+from utils import procfs
+from utils.scheduler import register_source
 
+# "  iface: rx_bytes rx_packets ... tx_bytes ..." lines of /proc/net/dev
+_NET_DEV_LINE = re.compile(rb"^ *([^:\s]+): *([\d ]+)$", re.M)
+
+def _operstate(iface):
+    """Link state from /sys/class/net/<iface>/operstate ("up", "down", ...)."""
+    data = procfs.read_bytes(procfs.sys_path('class', 'net', iface, 'operstate'))
+    if data is None:
+        return "unknown"
+    return bytes(data).strip().decode(errors="replace") or "unknown"
+
+@register_source("net", 1.0)
 def get_net_stats():
-    """Enhanced network stats with interface breakdown."""
+    """
+    Network stats per interface and in total.
+
+    Each interface reports cumulative rx/tx bytes, rx/tx KB/s, packets/s,
+    cumulative errors and drops (plus how many were added this interval)
+    and its link state. Rates come from per-interface deltas over
+    time.monotonic(), so interfaces that appear or vanish never produce a
+    spike. Interfaces are ordered by current throughput, busiest first.
+    """
     net_state = get_state()["net"]
-    interfaces = {}
-    rx_total, tx_total = 0, 0
-    
+    counters = {}
+
     try:
-        with open('/proc/net/dev') as f:
-            for line in f.readlines()[2:]:
-                parts = line.split()
-                if len(parts) > 9:
-                    iface = parts[0].rstrip(':')
-                    # Skip loopback
-                    if iface == 'lo':
-                        continue
-                    rx = int(parts[1])
-                    tx = int(parts[9])
-                    interfaces[iface] = {"rx": rx, "tx": tx}
-                    rx_total += rx
-                    tx_total += tx
+        for m in _NET_DEV_LINE.finditer(procfs.read_bytes(procfs.proc_path('net/dev'))):
+            iface = m.group(1).decode()
+            # Skip loopback
+            if iface == 'lo':
+                continue
+            parts = m.group(2).split()
+            if len(parts) > 11:
+                # rx: bytes packets errs drop ...; tx (from 8): bytes packets errs drop ...
+                counters[iface] = (
+                    int(parts[0]), int(parts[8]), int(parts[1]), int(parts[9]),
+                    int(parts[2]) + int(parts[10]), int(parts[3]) + int(parts[11]),
+                )
     except:
         pass
 
-    now = time.time()
-    dt = now - net_state["time"]
-    if dt > 0:
-        net_state["rx_s"] = (rx_total - net_state["rx"]) / dt / 1024
-        net_state["tx_s"] = (tx_total - net_state["tx"]) / dt / 1024
-    
-    net_state.update({"rx": rx_total, "tx": tx_total, "time": now})
+    now = time.monotonic()
+    prev = net_state["ifaces"]
+    dt = now - net_state["time"] if net_state["time"] is not None else 0.0
+    net_state.update({"ifaces": counters, "time": now})
+    for iface in prev.keys() - counters.keys():
+        # A removed link (tun, rmnet) would otherwise pin its operstate fd
+        procfs.close(procfs.sys_path('class', 'net', iface, 'operstate'))
+
+    interfaces = {}
+    rx_total, tx_total = 0, 0
+    rx_speed, tx_speed = 0.0, 0.0
+    for iface, (rx, tx, rx_pk, tx_pk, errs, drops) in counters.items():
+        rx_total += rx
+        tx_total += tx
+        data = {
+            "rx": rx, "tx": tx, "rx_speed": 0.0, "tx_speed": 0.0,
+            "rx_pps": 0.0, "tx_pps": 0.0, "errors": errs, "drops": drops,
+            "new_errors": 0, "new_drops": 0, "state": _operstate(iface),
+        }
+        old = prev.get(iface)
+        if old is not None and dt > 0:
+            # Counters reset when a link is re-created; clamp to zero
+            data["rx_speed"] = max(0, rx - old[0]) / dt / 1024
+            data["tx_speed"] = max(0, tx - old[1]) / dt / 1024
+            data["rx_pps"] = max(0, rx_pk - old[2]) / dt
+            data["tx_pps"] = max(0, tx_pk - old[3]) / dt
+            data["new_errors"] = max(0, errs - old[4])
+            data["new_drops"] = max(0, drops - old[5])
+            rx_speed += data["rx_speed"]
+            tx_speed += data["tx_speed"]
+        interfaces[iface] = data
+
+    ranked = sorted(interfaces, key=lambda i: (-(interfaces[i]["rx_speed"] + interfaces[i]["tx_speed"]), i))
     return {
         "rx_total": rx_total / (1024**2),
         "tx_total": tx_total / (1024**2),
-        "rx_speed": net_state["rx_s"],
-        "tx_speed": net_state["tx_s"],
-        "interfaces": interfaces
+        "rx_speed": rx_speed,
+        "tx_speed": tx_speed,
+        "interfaces": {iface: interfaces[iface] for iface in ranked}
     }
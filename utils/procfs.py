@@ -0,0 +1,101 @@
+# procfs.py - Persistent descriptors and buffer reuse for hot /proc and /sys files
+
+import os
+
+# Mount points of procfs and sysfs; point both elsewhere with set_root()
+PROC = "/proc"
+SYS = "/sys"
+
+# path -> [fd, bytearray]
+_files = {}
+
+_INITIAL_BUFSIZE = 4096
+_MAX_BUFSIZE = 1 << 20
+
+
+def set_root(root):
+    """
+    Read procfs/sysfs from `root`/proc and `root`/sys instead of the live
+    system (e.g. a captured or synthetic tree). "/" restores the default.
+    """
+    global PROC, SYS
+    root = root.rstrip("/")
+    PROC = f"{root}/proc"
+    SYS = f"{root}/sys"
+    close_all()
+
+
+def proc_path(*parts):
+    """Path below the configured /proc."""
+    return "/".join((PROC,) + parts)
+
+
+def sys_path(*parts):
+    """Path below the configured /sys."""
+    return "/".join((SYS,) + parts)
+
+
+def _pread_into(fd, buf):
+    if hasattr(os, "preadv"):
+        return os.preadv(fd, [buf], 0)
+    data = os.pread(fd, len(buf), 0)
+    buf[: len(data)] = data
+    return len(data)
+
+
+def read_bytes(path):
+    """
+    Read a whole procfs/sysfs file through a descriptor kept open between
+    calls.
+
+    Each call is a single pread at offset 0 into a per-path buffer that is
+    reused (and grown if the file outgrows it), so steady-state reads cost
+    one syscall and no new buffer. The returned memoryview aliases that
+    buffer: parse it before the same path is read again.
+
+    Returns:
+        memoryview of the file contents, or None if it cannot be read
+    """
+    entry = _files.get(path)
+    try:
+        if entry is None:
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+            entry = _files[path] = [fd, bytearray(_INITIAL_BUFSIZE)]
+        fd, buf = entry
+        n = _pread_into(fd, buf)
+        # A full buffer may mean a truncated read; grow and retry
+        while n == len(buf) and len(buf) < _MAX_BUFSIZE:
+            buf = entry[1] = bytearray(len(buf) * 2)
+            n = _pread_into(fd, buf)
+        return memoryview(buf)[:n]
+    except OSError:
+        # File vanished (hotplug, exited process) or is not readable
+        close(path)
+        return None
+
+
+def read_int(path):
+    """Integer content of a sysfs attribute, or None."""
+    data = read_bytes(path)
+    if data is None:
+        return None
+    try:
+        return int(bytes(data))
+    except ValueError:
+        return None
+
+
+def close(path):
+    """Drop the cached descriptor for `path`, if any."""
+    entry = _files.pop(path, None)
+    if entry is not None:
+        try:
+            os.close(entry[0])
+        except OSError:
+            pass
+
+
+def close_all():
+    """Close every cached descriptor."""
+    for path in list(_files):
+        close(path)
@@ -0,0 +1,428 @@
+# recorder.py - Fixed-record binary ring file for recording and replaying snapshots
+
+import mmap
+import os
+import struct
+import time
+from datetime import timedelta
+
+MAGIC = b"TSMREC\x00\x01"
+# Bumped whenever the record layout changes; older files are refused
+VERSION = 3
+
+# Fixed record capacity per section
+MAX_CPUS = 16
+MAX_TEMPS = 4
+MAX_IFACES = 3
+MAX_PROCS = 8
+MAX_DISKS = 4
+MAX_CLUSTERS = 4
+
+# Default ring size: one hour at 2 samples/s
+DEFAULT_CAPACITY = 7200
+
+_USAGE_SRCS = ["unknown", "procstat", "cpuidle", "cpufreq"]
+# Fixed here rather than imported: they define the file format
+_CPU_TIMES = ("user", "system", "irq", "softirq", "steal", "iowait", "idle")
+_PSI_LINES = [(r, k) for r in ("cpu", "memory", "io") for k in ("some", "full")]
+_PSI_FIELDS = ("avg10", "avg60", "avg300", "rate")
+_DISK_FIELDS = ("read_speed", "write_speed", "read_iops", "write_iops", "latency_ms",
+                "queue", "util")
+_IFACE_RATES = ("rx_speed", "tx_speed", "rx_pps", "tx_pps")
+_IFACE_COUNTS = ("errors", "drops", "new_errors", "new_drops")
+
+# magic, version, record size, capacity, records written, os, kernel, arch
+_HEADER = struct.Struct("<8sIIIQ64s64s16s")
+_HEADER_SIZE = 256
+# Records-written counter inside the header, rewritten after every append
+_COUNT = struct.Struct("<Q")
+_COUNT_OFFSET = 20
+
+_RECORD = struct.Struct(
+    "<dI"  # wall time, uptime seconds
+    # cores: usage, cur MHz, max MHz, usage source, times present, _CPU_TIMES,
+    # cpufreq policy ("" without one), its cap (MHz)
+    + "B" + ("fHHB?" + "f" * len(_CPU_TIMES) + "12sH") * MAX_CPUS
+    + "?fffHI"  # load: present, 1/5/15 min, running, total
+    + "f" * 8  # mem (MB): used, total, buffers, cached, percent, swap total/used/free
+    + "fff"  # storage (GB): used, total, percent
+    + "?ff"  # disk io: present, read, write (MB/s)
+    + "B" + "16sf" * MAX_TEMPS  # temps: name, °C
+    + "?Bf12s12s?"  # battery: present, level, temp, status, health, stale
+    + "ffff"  # net: rx/tx total (MB), rx/tx speed (KB/s)
+    # interfaces: name, rx/tx bytes, _IFACE_RATES, _IFACE_COUNTS, operstate
+    + "B" + "16sQQffffIIII8s" * MAX_IFACES
+    + "B" + "I16sff" * MAX_PROCS  # processes: pid, name, cpu%, mem%
+    + "?f" + "f" * len(_CPU_TIMES)  # cpu total: present, busy %, _CPU_TIMES
+    + "?ffff" * len(_PSI_LINES)  # pressure: present, _PSI_FIELDS per _PSI_LINES
+    + "B" + "16sfffffffI" * MAX_DISKS  # disks: name, _DISK_FIELDS, in flight
+    + "??ff"  # clusters: present, hottest zone present, °C, rise
+    # clusters: policy, label, cpu bitmask, cur/max/limit MHz, usage, capped, throttled
+    + "B" + "12s8sQHHHf??" * MAX_CLUSTERS
+)
+
+
+def _s(text):
+    return str(text).encode(errors="replace")
+
+
+def _u(raw):
+    return raw.rstrip(b"\x00").decode(errors="replace")
+
+
+def _open_ring(path, writable, capacity=None):
+    """Map the ring file, creating or resetting it if needed when writing."""
+    mode = "r+b" if writable else "rb"
+    if writable and not os.path.exists(path):
+        mode = "w+b"
+    f = open(path, mode)
+    try:
+        head = f.read(_HEADER.size)
+        valid = (
+            len(head) == _HEADER.size
+            and head[:8] == MAGIC
+            and _HEADER.unpack(head)[1] == VERSION
+            and _HEADER.unpack(head)[2] == _RECORD.size
+        )
+        if not valid:
+            # Only ever initialise an empty file; never clobber other data
+            if not writable or head:
+                if head[:8] == MAGIC and len(head) == _HEADER.size:
+                    raise ValueError(f"{path}: recording format {_HEADER.unpack(head)[1]}, "
+                                     f"expected {VERSION}")
+                raise ValueError(f"{path}: not a recording (or different format)")
+            capacity = capacity or DEFAULT_CAPACITY
+            f.seek(0)
+            f.truncate(_HEADER_SIZE + capacity * _RECORD.size)
+            f.write(_HEADER.pack(MAGIC, VERSION, _RECORD.size, capacity, 0, b"", b"", b""))
+            f.flush()
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        mm = mmap.mmap(f.fileno(), 0, access=access)
+    except Exception:
+        f.close()
+        raise
+    return f, mm
+
+
+class Recorder:
+    """
+    Append snapshots to a memory-mapped ring of fixed-size records.
+
+    The file never grows past its capacity: once full, the oldest record
+    is overwritten. Each append is one struct.pack_into into the mapping,
+    so recording costs a few microseconds per tick and no allocation
+    beyond the packed values.
+    """
+
+    def __init__(self, path, capacity=None):
+        self._file, self._mm = _open_ring(path, True, capacity)
+        fields = _HEADER.unpack_from(self._mm, 0)
+        self.capacity = fields[3]
+        self.count = fields[4]
+        self._host_written = bool(fields[5].strip(b"\x00"))
+
+    def _write_host(self, info):
+        """Static host facts are stored once, in the header."""
+        _HEADER.pack_into(
+            self._mm, 0, MAGIC, VERSION, _RECORD.size, self.capacity, self.count,
+            _s(info["os"]), _s(info["kernel"]), _s(info["arch"]),
+        )
+        self._host_written = True
+
+    def append(self, snapshot, wall_time=None):
+        """Encode one snapshot into the next slot of the ring."""
+        values = [wall_time if wall_time is not None else time.time()]
+
+        info = snapshot["info"]
+        values.append(info.get("uptime_s", 0))
+
+        cores = snapshot["cpu"][:MAX_CPUS]
+        values.append(len(cores))
+        for i in range(MAX_CPUS):
+            if i < len(cores):
+                c = cores[i]
+                src = c.get("usage_src", "unknown")
+                values.extend((
+                    c.get("usage", 0.0), min(c.get("cur", 0), 65535),
+                    min(c.get("max", 0), 65535),
+                    _USAGE_SRCS.index(src) if src in _USAGE_SRCS else 0,
+                ))
+                times = c.get("times")
+                values.append(times is not None)
+                values.extend((times or {}).get(k, 0.0) for k in _CPU_TIMES)
+                values.extend((_s(c.get("cluster", "")), min(c.get("limit", 0), 65535)))
+            else:
+                values.extend((0.0, 0, 0, 0, False))
+                values.extend(0.0 for _ in _CPU_TIMES)
+                values.extend((b"", 0))
+
+        load = snapshot["load"]
+        if load:
+            values.extend((True, load["load1"], load["load5"], load["load15"],
+                           min(load["running"], 65535), load["total"]))
+        else:
+            values.extend((False, 0.0, 0.0, 0.0, 0, 0))
+
+        mem = snapshot["mem"]
+        values.extend((
+            mem["used"], mem["total"], mem["buffers"], mem["cached"], mem["percent"],
+            mem.get("swap_total", 0.0), mem.get("swap_used", 0.0), mem.get("swap_free", 0.0),
+        ))
+
+        storage = snapshot["storage"]
+        values.extend((storage["used"], storage["total"], storage["percent"]))
+
+        disk_io = snapshot["disk_io"]
+        if disk_io:
+            values.extend((True, disk_io["read_speed"], disk_io["write_speed"]))
+        else:
+            values.extend((False, 0.0, 0.0))
+
+        temps = snapshot["temps"][:MAX_TEMPS]
+        values.append(len(temps))
+        for i in range(MAX_TEMPS):
+            if i < len(temps):
+                values.extend((_s(temps[i]["name"]), temps[i]["temp"]))
+            else:
+                values.extend((b"", 0.0))
+
+        battery = snapshot["battery"]
+        if battery:
+            values.extend((
+                True, int(battery["level"]), float(battery.get("temp", 0) or 0),
+                _s(battery.get("status", "")), _s(battery.get("health", "")),
+                bool(battery.get("stale", False)),
+            ))
+        else:
+            values.extend((False, 0, 0.0, b"", b"", False))
+
+        net = snapshot["net"]
+        values.extend((net["rx_total"], net["tx_total"], net["rx_speed"], net["tx_speed"]))
+        ifaces = list((net.get("interfaces") or {}).items())[:MAX_IFACES]
+        values.append(len(ifaces))
+        for i in range(MAX_IFACES):
+            if i < len(ifaces):
+                name, data = ifaces[i]
+                values.extend((_s(name), data["rx"], data["tx"]))
+                values.extend(data.get(k, 0.0) for k in _IFACE_RATES)
+                values.extend(data.get(k, 0) for k in _IFACE_COUNTS)
+                values.append(_s(data.get("state", "")))
+            else:
+                values.extend((b"", 0, 0, 0.0, 0.0, 0.0, 0.0, 0, 0, 0, 0, b""))
+
+        procs = snapshot["procs"][:MAX_PROCS]
+        values.append(len(procs))
+        for i in range(MAX_PROCS):
+            if i < len(procs):
+                p = procs[i]
+                values.extend((p["pid"], _s(p["name"]), p["cpu"], p["mem"]))
+            else:
+                values.extend((0, b"", 0.0, 0.0))
+
+        total = snapshot.get("cpu_total")
+        if total:
+            values.extend((True, total["usage"]))
+            values.extend(total["times"].get(k, 0.0) for k in _CPU_TIMES)
+        else:
+            values.extend((False, 0.0))
+            values.extend(0.0 for _ in _CPU_TIMES)
+
+        pressure = snapshot.get("pressure") or {}
+        for resource, kind in _PSI_LINES:
+            line = pressure.get(resource, {}).get(kind)
+            if line:
+                values.append(True)
+                values.extend(line[k] for k in _PSI_FIELDS)
+            else:
+                values.extend((False, 0.0, 0.0, 0.0, 0.0))
+
+        disks = list(((disk_io or {}).get("devices") or {}).items())[:MAX_DISKS]
+        values.append(len(disks))
+        for i in range(MAX_DISKS):
+            if i < len(disks):
+                name, dev = disks[i]
+                values.append(_s(name))
+                values.extend(dev[k] for k in _DISK_FIELDS)
+                values.append(dev.get("inflight", 0))
+            else:
+                values.append(b"")
+                values.extend(0.0 for _ in _DISK_FIELDS)
+                values.append(0)
+
+        clusters = snapshot.get("clusters")
+        if clusters:
+            temp = clusters["temp"]
+            values.extend((True, temp is not None, temp or 0.0, clusters["rise"]))
+            groups = clusters["clusters"][:MAX_CLUSTERS]
+        else:
+            values.extend((False, False, 0.0, 0.0))
+            groups = []
+        values.append(len(groups))
+        for i in range(MAX_CLUSTERS):
+            if i < len(groups):
+                c = groups[i]
+                mask = sum(1 << int(cpu[3:]) for cpu in c["cpus"] if int(cpu[3:]) < 64)
+                values.extend((
+                    _s(c["name"]), _s(c["label"]), mask, min(c["cur"], 65535),
+                    min(c["max"], 65535), min(c["limit"], 65535), c["usage"],
+                    c["capped"], c["throttled"],
+                ))
+            else:
+                values.extend((b"", b"", 0, 0, 0, 0, 0.0, False, False))
+
+        slot = self.count % self.capacity
+        _RECORD.pack_into(self._mm, _HEADER_SIZE + slot * _RECORD.size, *values)
+        self.count += 1
+        _COUNT.pack_into(self._mm, _COUNT_OFFSET, self.count)
+        if not self._host_written:
+            self._write_host(info)
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+
+class Player:
+    """Read snapshots back from a ring file, oldest first."""
+
+    def __init__(self, path):
+        self._file, self._mm = _open_ring(path, False)
+        fields = _HEADER.unpack_from(self._mm, 0)
+        self.capacity = fields[3]
+        self.count = fields[4]
+        self._host = {"os": _u(fields[5]), "kernel": _u(fields[6]), "arch": _u(fields[7])}
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def record(self, index):
+        """Decode the index-th oldest record into (wall time, snapshot)."""
+        first = self.count - len(self)
+        slot = (first + index) % self.capacity
+        values = iter(_RECORD.unpack_from(self._mm, _HEADER_SIZE + slot * _RECORD.size))
+
+        wall = next(values)
+        uptime = next(values)
+        info = dict(self._host, uptime=str(timedelta(seconds=uptime)), uptime_s=uptime,
+                    proot=False)
+
+        ncpu = next(values)
+        cores = []
+        for i in range(MAX_CPUS):
+            usage, cur, max_f, src, has_times = (next(values) for _ in range(5))
+            times = {k: next(values) for k in _CPU_TIMES}
+            cluster, limit = next(values), next(values)
+            if i < ncpu:
+                core = {"id": f"cpu{i}", "cur": cur, "max": max_f,
+                        "usage": usage, "usage_src": _USAGE_SRCS[src]}
+                if has_times:
+                    core["times"] = times
+                if cluster.strip(b"\x00"):
+                    core["cluster"] = _u(cluster)
+                    core["limit"] = limit
+                cores.append(core)
+
+        has_load, l1, l5, l15, running, total = (next(values) for _ in range(6))
+        load = ({"load1": l1, "load5": l5, "load15": l15, "running": running, "total": total}
+                if has_load else None)
+
+        used, mtotal, buffers, cached, percent, swap_total, swap_used, swap_free = (
+            next(values) for _ in range(8))
+        mem = {"used": used, "total": mtotal, "buffers": buffers, "cached": cached,
+               "percent": percent}
+        if swap_total > 0:
+            mem.update(swap_total=swap_total, swap_used=swap_used, swap_free=swap_free)
+
+        s_used, s_total, s_percent = (next(values) for _ in range(3))
+        storage = {"used": s_used, "total": s_total, "percent": s_percent}
+
+        has_io, read_speed, write_speed = (next(values) for _ in range(3))
+        disk_io = {"read_speed": read_speed, "write_speed": write_speed} if has_io else None
+
+        ntemps = next(values)
+        temps = []
+        for i in range(MAX_TEMPS):
+            name, temp = next(values), next(values)
+            if i < ntemps:
+                temps.append({"name": _u(name), "temp": temp})
+
+        has_batt, level, b_temp, status, health, stale = (next(values) for _ in range(6))
+        battery = ({"level": level, "temp": b_temp, "status": _u(status),
+                    "health": _u(health), "stale": stale, "age": None}
+                   if has_batt else None)
+
+        rx_total, tx_total, rx_speed, tx_speed = (next(values) for _ in range(4))
+        nifaces = next(values)
+        interfaces = {}
+        for i in range(MAX_IFACES):
+            name, rx, tx = next(values), next(values), next(values)
+            rates = [next(values) for _ in _IFACE_RATES]
+            counts = [next(values) for _ in _IFACE_COUNTS]
+            state = next(values)
+            if i < nifaces:
+                data = {"rx": rx, "tx": tx, "state": _u(state)}
+                data.update(zip(_IFACE_RATES, rates))
+                data.update(zip(_IFACE_COUNTS, counts))
+                interfaces[_u(name)] = data
+        net = {"rx_total": rx_total, "tx_total": tx_total, "rx_speed": rx_speed,
+               "tx_speed": tx_speed, "interfaces": interfaces}
+
+        nprocs = next(values)
+        procs = []
+        for i in range(MAX_PROCS):
+            pid, name, cpu, pmem = next(values), next(values), next(values), next(values)
+            if i < nprocs:
+                procs.append({"pid": pid, "name": _u(name), "cpu": cpu, "mem": pmem})
+
+        has_total, busy = next(values), next(values)
+        times = {k: next(values) for k in _CPU_TIMES}
+        cpu_total = {"usage": busy, "times": times} if has_total else None
+
+        pressure = {}
+        for resource, kind in _PSI_LINES:
+            present = next(values)
+            line = {k: next(values) for k in _PSI_FIELDS}
+            if present:
+                pressure.setdefault(resource, {})[kind] = line
+
+        ndisks = next(values)
+        devices = {}
+        for i in range(MAX_DISKS):
+            name = next(values)
+            dev = {k: next(values) for k in _DISK_FIELDS}
+            dev["inflight"] = next(values)
+            if i < ndisks:
+                devices[_u(name)] = dev
+        if disk_io is not None:
+            disk_io["devices"] = devices
+
+        has_clusters, has_temp, hottest, rise = (next(values) for _ in range(4))
+        nclusters = next(values)
+        groups = []
+        for i in range(MAX_CLUSTERS):
+            name, label, mask, cur, max_f, limit, usage, capped, throttled = (
+                next(values) for _ in range(9))
+            if i < nclusters:
+                groups.append({
+                    "name": _u(name), "label": _u(label),
+                    "cpus": [f"cpu{n}" for n in range(64) if mask >> n & 1],
+                    "cur": cur, "max": max_f, "limit": limit, "usage": usage,
+                    "capped": capped, "throttled": throttled,
+                })
+        clusters = ({"clusters": groups, "temp": hottest if has_temp else None, "rise": rise}
+                    if has_clusters else None)
+
+        # Every replayed record is a new sample for every source
+        stamps = {name: wall for name in ("cpu", "cpu_total", "pressure", "mem", "net")}
+        return wall, {
+            "time": wall, "info": info, "stamps": stamps, "cpu": cores,
+            "cpu_total": cpu_total, "clusters": clusters, "load": load,
+            "pressure": pressure or None, "mem": mem, "storage": storage,
+            "disk_io": disk_io, "temps": temps, "battery": battery, "net": net,
+            "procs": procs,
+        }
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
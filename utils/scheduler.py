@@ -0,0 +1,195 @@
+# scheduler.py - Background sampling with a cadence per data source
+
+import threading
+import time
+
+# name -> {"fn", "kwargs", "interval", "next", "value", "time", "duration",
+#          "paused", "discard"}
+_sources = {}
+_stop = threading.Event()
+# Set to make the sampler thread re-check due times early
+_wake = threading.Event()
+_thread = None
+
+
+def register_source(name, interval, **kwargs):
+    """
+    Decorator registering a collector under `name`.
+
+    The collector is called with `kwargs` every `interval` seconds, or only
+    once when `interval` is None. The decorated function is returned
+    unchanged so it can still be called directly.
+    """
+    def wrap(fn):
+        _sources[name] = {
+            "fn": fn,
+            "kwargs": kwargs,
+            "interval": interval,
+            "next": 0.0,
+            "value": None,
+            "time": None,
+            "duration": None,
+            "paused": False,
+            "discard": False,
+        }
+        return fn
+    return wrap
+
+
+def register_output(name):
+    """
+    Register `name` as a value another collector computes as a by-product
+    and hands over with publish(); it is never sampled on its own.
+    """
+    _sources[name] = {
+        "fn": None,
+        "kwargs": {},
+        "interval": None,
+        "next": None,
+        "value": None,
+        "time": None,
+        "duration": None,
+        "paused": False,
+        "discard": False,
+    }
+
+
+def publish(name, value):
+    """Store `value` as the latest sample of the output `name`, stamped now."""
+    src = _sources.get(name)
+    if src is not None:
+        src["value"] = value
+        src["time"] = time.monotonic()
+
+
+def set_interval(name, interval):
+    """Change the cadence of a registered source; takes effect from its next sample."""
+    src = _sources.get(name)
+    if src is None:
+        return
+    src["interval"] = interval
+    if src["next"] is not None and src["time"] is not None and interval is not None:
+        if src["time"] + interval < src["next"]:
+            src["next"] = src["time"] + interval
+            _wake.set()
+
+
+def set_paused(name, paused):
+    """
+    Stop (or resume) sampling a source whose output nobody is reading.
+
+    Its last value stays available. A resumed source is run again right
+    away, but that run only re-primes its delta state (rates over the
+    whole pause would be averages over minutes) and is discarded; the
+    next sample, one interval later, replaces the last value.
+    """
+    src = _sources.get(name)
+    if src is None or src["paused"] == paused:
+        return
+    src["paused"] = paused
+    if not paused and src["interval"] is not None:
+        src["next"] = 0.0
+        src["discard"] = True
+        _wake.set()
+
+
+def get_source_names():
+    """Names of all registered sources."""
+    return list(_sources)
+
+
+def get_interval(name):
+    """Current cadence of a registered source, or None."""
+    src = _sources.get(name)
+    return src["interval"] if src else None
+
+
+def run_due(now=None):
+    """
+    Run every source whose interval has elapsed.
+
+    A collector that raises keeps its previous value; paused sources are
+    skipped. Returns the number of seconds until the next source is due.
+    """
+    if now is None:
+        now = time.monotonic()
+    next_due = now + 1.0
+    for src in _sources.values():
+        if src["paused"]:
+            continue
+        due = src["next"]
+        if due is not None and due <= now:
+            start = time.perf_counter()
+            try:
+                value = src["fn"](**src["kwargs"])
+                if src["discard"]:
+                    src["discard"] = False
+                else:
+                    src["value"] = value
+                    src["time"] = time.monotonic()
+            except Exception:
+                pass
+            src["duration"] = time.perf_counter() - start
+            interval = src["interval"]
+            due = src["next"] = None if interval is None else now + interval
+        if due is not None:
+            next_due = min(next_due, due)
+    return max(0.0, next_due - time.monotonic())
+
+
+def get_latest(name, default=None):
+    """Latest value collected for `name`, or `default` if never sampled."""
+    src = _sources.get(name)
+    if src is None or src["time"] is None:
+        return default
+    return src["value"]
+
+
+def get_sample_time(name):
+    """Monotonic time of the latest sample for `name`, or None."""
+    src = _sources.get(name)
+    return src["time"] if src else None
+
+
+def get_durations():
+    """Wall time (seconds) of the latest run of each source that has run."""
+    return {
+        name: src["duration"]
+        for name, src in _sources.items()
+        if src["duration"] is not None
+    }
+
+
+def _loop():
+    while not _stop.is_set():
+        _wake.wait(run_due())
+        _wake.clear()
+
+
+def start():
+    """
+    Sample every source once in the caller, then keep sampling in a
+    daemon thread so readers always find a complete cache.
+    """
+    global _thread
+    if is_running():
+        return
+    run_due()
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="sampler", daemon=True)
+    _thread.start()
+
+
+def stop():
+    """Stop the background sampling thread."""
+    global _thread
+    _stop.set()
+    _wake.set()
+    if _thread is not None:
+        _thread.join(timeout=2)
+        _thread = None
+
+
+def is_running():
+    """Whether the background sampling thread is active."""
+    return _thread is not None and _thread.is_alive()
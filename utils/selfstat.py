@@ -0,0 +1,113 @@
+# selfstat.py - The monitor's own overhead: collector/panel timings, jitter, CPU and RSS
+
+import os
+import time
+
+from utils import procfs
+from utils import scheduler
+from utils.history import Ring
+from utils.scheduler import register_source
+
+try:
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+    _PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+except (ValueError, OSError, AttributeError):
+    _CLK_TCK = 100
+    _PAGE_KB = 4
+
+_state = {
+    # panel name -> seconds Rich spent rendering it the last time it changed
+    "panels": {},
+    # last tick time and recent |actual - expected| tick intervals (ms)
+    "tick": None,
+    "jitter": Ring(32),
+    # previous utime+stime (ticks) and sample time for self CPU%
+    "cpu_ticks": None,
+    "cpu_t": None,
+    # intended seconds between ticks, as passed to mark_tick()
+    "interval": None,
+    # terminal bytes of the last frame and of a full repaint (diff renderer)
+    "out_bytes": None,
+    "out_full_bytes": None,
+}
+
+
+def record_panel(name, seconds):
+    """Remember how long rendering one panel's lines took."""
+    _state["panels"][name] = seconds
+
+
+def record_output(written, full):
+    """Bytes written to the terminal for the last frame, and for a full repaint."""
+    _state["out_bytes"] = written
+    _state["out_full_bytes"] = full
+
+
+def mark_tick(expected):
+    """Call once per loop iteration; `expected` is the intended period (s)."""
+    now = time.monotonic()
+    last = _state["tick"]
+    _state["tick"] = now
+    _state["interval"] = expected
+    if last is not None:
+        _state["jitter"].append(abs((now - last) - expected) * 1000.0)
+
+
+@register_source("self", 1.0)
+def get_self_usage():
+    """
+    CPU% (of one core) since the previous call and RSS, from /proc/self/stat.
+
+    Always the live /proc: with --root the captured tree's "self" is not us.
+    """
+    data = procfs.read_bytes("/proc/self/stat")
+    if data is None:
+        return None
+    fields = data.tobytes().rpartition(b")")[2].split()
+    ticks = int(fields[11]) + int(fields[12])
+    rss_mb = int(fields[21]) * _PAGE_KB / 1024
+
+    now = time.monotonic()
+    cpu = None
+    if _state["cpu_ticks"] is not None and now > _state["cpu_t"]:
+        cpu = (ticks - _state["cpu_ticks"]) / _CLK_TCK / (now - _state["cpu_t"]) * 100
+    _state["cpu_ticks"] = ticks
+    _state["cpu_t"] = now
+    return {"cpu": cpu, "rss_mb": rss_mb}
+
+
+def get_monitor_stats():
+    """
+    Overhead of the monitor itself.
+
+    Returns:
+        Dict with cpu (% of one core, None until two samples), rss_mb,
+        collectors (name -> ms of the latest run), panels (name -> ms of
+        their latest Rich render), jitter_ms and jitter_max_ms over recent
+        ticks, slowest (name, ms) among collectors and panels, interval (s,
+        the current tick period), and
+        out_bytes / out_full_bytes for the last frame when the
+        low-bandwidth renderer is active.
+    """
+    usage = scheduler.get_latest("self") or {}
+    collectors = {k: v * 1000.0 for k, v in scheduler.get_durations().items()}
+    panels = {k: v * 1000.0 for k, v in _state["panels"].items()}
+    jitter = _state["jitter"].tolist()
+
+    slowest = None
+    for name, ms in list(collectors.items()) + [(f"{k} panel", v) for k, v in panels.items()]:
+        if slowest is None or ms > slowest[1]:
+            slowest = (name, ms)
+
+    return {
+        "cpu": usage.get("cpu"),
+        "rss_mb": usage.get("rss_mb"),
+        "collectors": collectors,
+        "panels": panels,
+        "jitter_ms": sum(jitter) / len(jitter) if jitter else None,
+        "jitter_max_ms": max(jitter) if jitter else None,
+        "slowest": slowest,
+        "interval": _state["interval"],
+        "out_bytes": _state["out_bytes"],
+        "out_full_bytes": _state["out_full_bytes"],
+    }
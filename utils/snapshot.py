@@ -0,0 +1,64 @@
+# snapshot.py - Read every data source once per tick and share the result
+
+import time
+
+# Imported for their @register_source side effects
+import hardware.hardware  # noqa: F401
+import utils.network  # noqa: F401
+import utils.system_info  # noqa: F401
+# Registered last so it reads this round's samples when run inline
+import utils.alerts  # noqa: F401
+from utils import scheduler
+from utils.system_info import get_sys_info
+from utils.selfstat import get_monitor_stats
+
+# Fallbacks used until a source has produced its first sample
+_DEFAULTS = {
+    "cpu": [],
+    "cpu_total": None,
+    "clusters": None,
+    "load": None,
+    "pressure": None,
+    "mem": {"used": 0, "total": 1, "buffers": 0, "cached": 0, "percent": 0},
+    "storage": {"used": 0, "total": 1, "percent": 0},
+    "disk_io": None,
+    "temps": [],
+    "battery": None,
+    "net": {"rx_total": 0, "tx_total": 0, "rx_speed": 0, "tx_speed": 0, "interfaces": {}},
+    "procs": [],
+    "threads": None,
+    "alerts": None,
+}
+
+
+def snapshot_defaults():
+    """
+    A snapshot with every source at its fallback, for filling in fields a
+    partial snapshot (e.g. one received from an agent) does not carry.
+    """
+    return dict(_DEFAULTS)
+
+
+def take_snapshot():
+    """
+    Collect the latest sample of every source.
+
+    When the background scheduler is running this only reads its cache, so
+    rendering never waits on a collector. Otherwise the sources that are
+    due are sampled inline first, honouring the same per-source cadence.
+
+    Delta-based collectors (/proc/stat, diskstats, net/dev) advance their
+    state once per sample, so history and every panel see the same numbers
+    instead of re-reading and measuring a few-millisecond delta.
+    """
+    if not scheduler.is_running():
+        scheduler.run_due()
+
+    # Host facts are collected once; only uptime is computed per tick
+    snapshot = {"time": time.monotonic(), "info": get_sys_info(), "stamps": {}}
+    for name, default in _DEFAULTS.items():
+        snapshot[name] = scheduler.get_latest(name, default)
+        snapshot["stamps"][name] = scheduler.get_sample_time(name)
+    # The monitor's own overhead (collector/panel timings, jitter, CPU, RSS)
+    snapshot["monitor"] = get_monitor_stats()
+    return snapshot
@@ -1,12 +1,36 @@
 # system_info.py - Enhanced version with top processes support
+import heapq
 import os
 import platform
+import re
 import time
+from collections import namedtuple
 from datetime import timedelta
+from functools import lru_cache
 
-def get_sys_info():
-    """Enhanced environment detection."""
-    in_proot = os.path.exists("/run/proot") or os.environ.get("PROOT_TMP_DIR")
+from utils.utils import get_state
+from utils import procfs
+from utils.scheduler import register_source
+
+try:
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+    _PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+except (ValueError, OSError, AttributeError):
+    _CLK_TCK = 100
+    _PAGE_KB = 4
+_NCPU = os.cpu_count() or 1
+
+# Static host facts; none of these change while the monitor runs
+HostInfo = namedtuple("HostInfo", ["os", "kernel", "arch", "proot"])
+
+# CLOCK_BOOTTIME minus CLOCK_MONOTONIC, captured once for the fallback path
+_boot_offset = None
+
+@register_source("host", None)
+@lru_cache(maxsize=None)
+def get_host_info():
+    """Detect distro, kernel, arch and proot once."""
+    in_proot = bool(os.path.exists("/run/proot") or os.environ.get("PROOT_TMP_DIR"))
     distro = "Termux (Native)" if not in_proot else "Proot"
     
     if os.path.exists("/etc/os-release"):
@@ -29,130 +53,462 @@ def get_sys_info():
             pass
     
     uname = platform.uname()
-    
+    return HostInfo(distro, uname.release, uname.machine, in_proot)
+
+def get_uptime_seconds():
+    """Seconds since boot, including time spent suspended."""
+    global _boot_offset
     try:
-        uptime_sec = int(time.clock_gettime(time.CLOCK_BOOTTIME))
-    except:
-        # Fallback for systems without CLOCK_BOOTTIME
+        # vDSO clock read: no syscall or file I/O on most kernels
+        return int(time.clock_gettime(time.CLOCK_BOOTTIME))
+    except (AttributeError, OSError):
+        pass
+    # Fallback for systems without CLOCK_BOOTTIME: read /proc/uptime once
+    # and advance it with the monotonic clock afterwards
+    if _boot_offset is None:
         try:
-            with open('/proc/uptime') as f:
-                uptime_sec = int(float(f.read().split()[0]))
+            with open(procfs.proc_path('uptime')) as f:
+                _boot_offset = float(f.read().split()[0]) - time.monotonic()
         except:
-            uptime_sec = 0
-    
+            _boot_offset = -time.monotonic()
+    return int(time.monotonic() + _boot_offset)
+
+def get_sys_info():
+    """Enhanced environment detection: cached host facts plus current uptime."""
+    host = get_host_info()
+    uptime_s = get_uptime_seconds()
     return {
-        "os": distro,
-        "kernel": uname.release,
-        "arch": uname.machine,
-        "uptime": str(timedelta(seconds=uptime_sec)),
-        "proot": in_proot
+        "os": host.os,
+        "kernel": host.kernel,
+        "arch": host.arch,
+        "uptime": str(timedelta(seconds=uptime_s)),
+        "uptime_s": uptime_s,
+        "proot": host.proot
     }
 
+@register_source("load", 2.0)
 def get_load_info():
     """Get load average and process count."""
     try:
-        with open('/proc/loadavg') as f:
-            loads = f.read().split()
-            load1, load5, load15 = loads[:3]
-            running, total = loads[3].split('/')
-            
-            return {
-                "load1": float(load1),
-                "load5": float(load5),
-                "load15": float(load15),
-                "running": int(running),
-                "total": int(total)
-            }
+        loads = procfs.read_bytes(procfs.proc_path('loadavg')).tobytes().split()
+        load1, load5, load15 = loads[:3]
+        running, total = loads[3].split(b'/')
+        
+        return {
+            "load1": float(load1),
+            "load5": float(load5),
+            "load15": float(load15),
+            "running": int(running),
+            "total": int(total)
+        }
     except:
         return None
 
+# Resources reported under /proc/pressure
+PSI_RESOURCES = ("cpu", "memory", "io")
+# "some avg10=0.00 avg60=0.00 avg300=0.00 total=123" lines
+_PSI_LINE = re.compile(rb"^(some|full) avg10=([\d.]+) avg60=([\d.]+) avg300=([\d.]+) total=(\d+)", re.M)
+
+@register_source("pressure", 1.0)
+def get_pressure():
+    """
+    Pressure Stall Information from /proc/pressure/{cpu,memory,io}.
+
+    Besides the kernel's avg10/avg60/avg300 (percent of time stalled),
+    the cumulative stall `total` (microseconds) is turned into a rate over
+    the last interval, so short stalls show up within one tick.
+
+    Returns:
+        {resource: {"some"|"full": {avg10, avg60, avg300, rate, total_us}}},
+        or None on kernels without PSI (checked once)
+    """
+    psi_state = get_state()["pressure"]
+    if psi_state["available"] is False:
+        return None
+    now = time.monotonic()
+    dt = now - psi_state["time"] if psi_state["time"] is not None else 0.0
+    prev = psi_state["totals"]
+    totals = {}
+    result = {}
+    for resource in PSI_RESOURCES:
+        data = procfs.read_bytes(procfs.proc_path("pressure", resource))
+        if data is None:
+            continue
+        lines = {}
+        for m in _PSI_LINE.finditer(data):
+            kind = m.group(1).decode()
+            total = int(m.group(5))
+            key = (resource, kind)
+            totals[key] = total
+            last = prev.get(key)
+            rate = (max(0, total - last) / (dt * 1e6) * 100) if last is not None and dt > 0 else 0.0
+            lines[kind] = {
+                "avg10": float(m.group(2)),
+                "avg60": float(m.group(3)),
+                "avg300": float(m.group(4)),
+                "rate": min(100.0, rate),
+                "total_us": total,
+            }
+        if lines:
+            result[resource] = lines
+    if psi_state["available"] is None:
+        # Missing directory, or PSI compiled in but disabled (psi=0)
+        psi_state["available"] = bool(result)
+    psi_state.update(totals=totals, time=now)
+    return result or None
+
+def _mem_total_kb(proc_state):
+    """MemTotal never changes at runtime; read it once."""
+    if "mem_total" not in proc_state:
+        mem_total = 0
+        try:
+            with open(procfs.proc_path('meminfo')) as f:
+                for line in f:
+                    if line.startswith('MemTotal:'):
+                        mem_total = int(line.split()[1])
+                        break
+        except Exception:
+            pass
+        proc_state["mem_total"] = mem_total
+    return proc_state["mem_total"]
+
+# How the process list is collapsed: None (flat), "tree", "name" or "uid".
+# Groups whose label is in "expand" also list their busiest members.
+GROUP_MODES = ("tree", "name", "uid")
+_grouping = {"by": None, "expand": frozenset()}
+
+# Process trees are rolled up to the child of one of these (or of PID 0/1):
+# apps forked by zygote, services started by init/systemd stay separate
+_TREE_ROOTS = frozenset({"init", "systemd", "zygote", "zygote64", "kthreadd"})
+
+# Members listed under an expanded group
+MAX_MEMBERS = 5
+
+def set_process_grouping(by=None, expand=()):
+    """
+    Collapse the process list by "tree", "name" or "uid" (None: flat).
+
+    Args:
+        by: One of GROUP_MODES, or None
+        expand: Group labels whose top members are listed too
+    """
+    if by is not None and by not in GROUP_MODES:
+        raise ValueError(f"unknown process grouping: {by}")
+    _grouping["by"] = by
+    _grouping["expand"] = frozenset(expand)
+
+@lru_cache(maxsize=256)
+def _user_name(uid):
+    """Login name for `uid`; Android app UIDs as u<user>_a<app>."""
+    try:
+        import pwd
+        return pwd.getpwuid(uid).pw_name
+    except (ImportError, KeyError):
+        pass
+    app = uid % 100000
+    if 10000 <= app < 20000:
+        return f"u{uid // 100000}_a{app - 10000}"
+    return str(uid)
+
+def _tree_roots(ppids, names):
+    """
+    Map every PID to the top of its process tree (see _TREE_ROOTS).
+
+    Args:
+        ppids: pid -> parent pid for this scan
+        names: pid -> command name
+
+    Each PID is resolved once: chains are walked only until they reach a
+    PID already resolved in this scan.
+    """
+    roots = {}
+    for pid in ppids:
+        chain = []
+        cur = pid
+        while cur not in roots:
+            parent = ppids.get(cur)
+            if parent is None or parent in ("0", "1") or names.get(parent) in _TREE_ROOTS \
+                    or names.get(cur) in _TREE_ROOTS or len(chain) > 4096:
+                roots[cur] = cur
+                break
+            chain.append(cur)
+            cur = parent
+        top = roots[cur]
+        for c in chain:
+            roots[c] = top
+    return roots
+
+@register_source("procs", 2.0, limit=8)
 def get_top_processes(limit=10):
     """
-    Get top processes by CPU usage.
-    Parses /proc to find process information.
+    Get top processes (or process groups) by CPU usage over the last
+    sampling interval.
+
+    utime+stime is remembered per (pid, starttime) between calls, so CPU%
+    is the share of all cores used since the previous scan rather than a
+    lifetime average, and a recycled PID never inherits an old counter.
+    Each PID costs one read of /proc/[pid]/stat: the name is taken from the
+    comm field once and cached, RSS comes from the rss field and the parent
+    from the ppid field. The parent map is kept between scans and updated
+    only for processes that started, exited or were reparented.
+
+    With set_process_grouping(), CPU and memory are summed per process
+    tree, command name (Android ":remote"-style suffixes dropped) or UID.
     
     Args:
-        limit: Maximum number of processes to return
+        limit: Maximum number of processes (or groups) to return
     
     Returns:
-        List of dicts with pid, name, cpu, mem
+        List of dicts with pid, name, cpu, mem; groups add count, group
+        and, when expanded, members (same shape, busiest first)
     """
-    processes = []
+    proc_state = get_state()["procs"]
+    prev_ticks = proc_state["ticks"]
+    names = proc_state["names"]
+    parents = proc_state["parents"]
+    now = time.monotonic()
+    dt = now - proc_state["time"] if proc_state["time"] else 0.0
+    # Capacity of all cores over the interval, in clock ticks
+    capacity = dt * _CLK_TCK * _NCPU
+    
+    ticks = {}
+    samples = []
     
     try:
-        # Get total memory for percentage calculation
-        with open('/proc/meminfo') as f:
-            mem_total = 0
-            for line in f:
-                if line.startswith('MemTotal:'):
-                    mem_total = int(line.split()[1])
-                    break
-        
-        # Get CPU info for time calculations
-        with open('/proc/stat') as f:
-            cpu_line = f.readline()
-            cpu_times = [int(x) for x in cpu_line.split()[1:]]
-            total_cpu_time = sum(cpu_times)
+        mem_total = _mem_total_kb(proc_state)
         
         # Iterate through /proc/[pid] directories
-        for pid_dir in os.listdir('/proc'):
+        proc_root = procfs.PROC
+        for pid_dir in os.listdir(proc_root):
             if not pid_dir.isdigit():
                 continue
             
-            pid = int(pid_dir)
-            
             try:
-                # Get process name from /proc/[pid]/comm
-                with open(f'/proc/{pid}/comm') as f:
-                    name = f.read().strip()
-                
-                # Get CPU usage from /proc/[pid]/stat
-                with open(f'/proc/{pid}/stat') as f:
+                with open(f'{proc_root}/{pid_dir}/stat', 'rb') as f:
                     stat_data = f.read()
-                    # Handle process names with spaces/parentheses
-                    stat_parts = stat_data.split(')')
-                    if len(stat_parts) < 2:
-                        continue
-                    
-                    stat_fields = stat_parts[1].split()
-                    if len(stat_fields) < 22:
-                        continue
-                    
-                    utime = int(stat_fields[11])  # User time
-                    stime = int(stat_fields[12])  # System time
-                    proc_time = utime + stime
-                    
-                    # Rough CPU percentage (simplified)
-                    cpu_percent = (proc_time / total_cpu_time * 100) if total_cpu_time > 0 else 0
-                
-                # Get memory usage from /proc/[pid]/status
-                mem_kb = 0
-                with open(f'/proc/{pid}/status') as f:
-                    for line in f:
-                        if line.startswith('VmRSS:'):
-                            mem_kb = int(line.split()[1])
-                            break
-                
-                mem_percent = (mem_kb / mem_total * 100) if mem_total > 0 else 0
-                
-                processes.append({
-                    'pid': pid,
-                    'name': name,
-                    'cpu': cpu_percent,
-                    'mem': mem_percent
-                })
-            
-            except (FileNotFoundError, PermissionError, ValueError):
+            except (FileNotFoundError, PermissionError, ProcessLookupError):
                 # Process may have terminated or we don't have permission
                 continue
+            
+            # Handle process names with spaces/parentheses
+            rparen = stat_data.rfind(b')')
+            if rparen < 0:
+                continue
+            stat_fields = stat_data[rparen + 2:].split()
+            if len(stat_fields) < 22:
+                continue
+            
+            try:
+                proc_time = int(stat_fields[11]) + int(stat_fields[12])  # utime + stime
+                key = (pid_dir, int(stat_fields[19]))  # (pid, starttime)
+                rss_kb = int(stat_fields[21]) * _PAGE_KB
+            except ValueError:
+                continue
+            
+            ticks[key] = proc_time
+            ppid = stat_fields[1].decode()
+            if parents.get(pid_dir) != ppid:
+                parents[pid_dir] = ppid
+            
+            last = prev_ticks.get(key)
+            delta = proc_time - last if last is not None else 0
+            samples.append((delta, rss_kb, key, stat_data, rparen))
+        
+        # Forget parents of exited processes
+        for pid in parents.keys() - {key[0] for key in ticks}:
+            del parents[pid]
+        
+        # Drop cached names and UIDs of processes that have exited
+        names = {k: v for k, v in names.items() if k in ticks}
+        proc_state["uids"] = {k: v for k, v in proc_state["uids"].items() if k in ticks}
         
-        # Sort by CPU usage (descending) and return top N
-        processes.sort(key=lambda x: x['cpu'], reverse=True)
-        return processes[:limit]
+        def name_of(delta, rss_kb, key, stat_data, rparen):
+            name = names.get(key)
+            if name is None:
+                lparen = stat_data.find(b'(')
+                name = names[key] = stat_data[lparen + 1:rparen].decode(errors='replace')
+            return name
+        
+        def entry(pid, name, delta, rss_kb):
+            return {
+                'pid': int(pid),
+                'name': name,
+                'cpu': (delta / capacity * 100) if capacity > 0 else 0.0,
+                'mem': (rss_kb / mem_total * 100) if mem_total > 0 else 0,
+            }
+        
+        by = _grouping["by"]
+        if by:
+            processes = _group_samples(samples, by, limit, name_of, entry, parents, proc_state)
+        else:
+            # Select top N without sorting the whole table
+            top = heapq.nlargest(limit, samples, key=lambda s: (s[0], s[1]))
+            processes = [entry(s[2][0], name_of(*s), s[0], s[1]) for s in top]
+        proc_state["names"] = names
+        
+        return processes
     
-    except Exception as e:
+    except Exception:
         # Fallback: return empty list on error
         return []
+    finally:
+        proc_state["ticks"] = ticks
+        proc_state["time"] = now
+
+def _group_samples(samples, by, limit, name_of, entry, parents, proc_state):
+    """Roll per-process samples up into the top `limit` groups."""
+    if by == "tree":
+        pid_names = {s[2][0]: name_of(*s) for s in samples}
+        roots = _tree_roots(parents, pid_names)
+        label_of = lambda s: roots.get(s[2][0], s[2][0])
+    elif by == "name":
+        label_of = lambda s: name_of(*s).split(":", 1)[0]
+    else:
+        uids = proc_state["uids"]
+        proc_root = procfs.PROC
+        def label_of(s):
+            uid = uids.get(s[2])
+            if uid is None:
+                try:
+                    uid = uids[s[2]] = os.stat(f"{proc_root}/{s[2][0]}").st_uid
+                except OSError:
+                    uid = -1
+            return uid
+    
+    # label -> [cpu ticks, rss kB, process count, heaviest sample, members]
+    groups = {}
+    for s in samples:
+        label = label_of(s)
+        g = groups.get(label)
+        if g is None:
+            groups[label] = [s[0], s[1], 1, s, [s]]
+        else:
+            g[0] += s[0]
+            g[1] += s[1]
+            g[2] += 1
+            if (s[0], s[1]) > (g[3][0], g[3][1]):
+                g[3] = s
+            g[4].append(s)
+    
+    expand = _grouping["expand"]
+    result = []
+    for label, (delta, rss_kb, count, lead, members) in heapq.nlargest(
+            limit, groups.items(), key=lambda item: (item[1][0], item[1][1])):
+        if by == "tree":
+            # Named and numbered after the tree's top process
+            pid, name = label, pid_names.get(label, label)
+        elif by == "uid":
+            pid, name = lead[2][0], _user_name(label) if label >= 0 else "?"
+        else:
+            pid, name = lead[2][0], label
+        group = entry(pid, name, delta, rss_kb)
+        group['count'] = count
+        group['group'] = by
+        if name in expand and count > 1:
+            top = heapq.nlargest(MAX_MEMBERS, members, key=lambda m: (m[0], m[1]))
+            group['members'] = [entry(m[2][0], name_of(*m), m[0], m[1]) for m in top]
+        result.append(group)
+    return result
+
+# Threads listed by the drilldown
+MAX_THREADS = 12
+
+def set_thread_target(pid=None):
+    """
+    Open the per-thread drilldown for `pid`, or close it with None.
+
+    Closing (or switching PID) drops all per-thread state.
+    """
+    state = get_state()
+    if pid is None:
+        state["threads"] = None
+    elif state["threads"] is None or state["threads"]["pid"] != pid:
+        state["threads"] = {"pid": pid, "ticks": {}, "time": 0.0}
+
+@register_source("threads", 0.5)
+def get_thread_stats():
+    """
+    Per-thread CPU for the drilldown PID, from /proc/[pid]/task/*/stat.
+
+    Per-TID state is one (starttime, utime+stime) tuple, so a recycled TID
+    never inherits another thread's counter. CPU% is the share of one core
+    since the previous sample, like top's thread view.
+
+    Returns:
+        None when no drilldown is open; else a dict with pid, name, count,
+        cpu (sum over threads), gone (process exited) and threads: the
+        busiest MAX_THREADS as dicts with tid, name, state, cpu, last_cpu
+    """
+    thread_state = get_state()["threads"]
+    if thread_state is None:
+        return None
+    pid = thread_state["pid"]
+    prev = thread_state["ticks"]
+    now = time.monotonic()
+    dt = now - thread_state["time"] if thread_state["time"] else 0.0
+    # One core over the interval, in clock ticks
+    capacity = dt * _CLK_TCK
+
+    task_dir = f"{procfs.PROC}/{pid}/task"
+    try:
+        tids = os.listdir(task_dir)
+    except OSError:
+        thread_state.update(ticks={}, time=now)
+        return {"pid": pid, "name": "?", "count": 0, "cpu": 0.0, "gone": True, "threads": []}
+
+    ticks = {}
+    samples = []
+    for tid in tids:
+        try:
+            with open(f"{task_dir}/{tid}/stat", "rb") as f:
+                stat_data = f.read()
+        except OSError:
+            # Thread exited between listing and reading
+            continue
+        rparen = stat_data.rfind(b')')
+        fields = stat_data[rparen + 2:].split()
+        if rparen < 0 or len(fields) < 37:
+            continue
+        try:
+            start = int(fields[19])
+            total = int(fields[11]) + int(fields[12])  # utime + stime
+        except ValueError:
+            continue
+        ticks[tid] = (start, total)
+        last = prev.get(tid)
+        delta = total - last[1] if last is not None and last[0] == start else 0
+        samples.append((delta, tid, stat_data, rparen, fields))
+    thread_state.update(ticks=ticks, time=now)
+
+    def comm(stat_data, rparen):
+        return stat_data[stat_data.find(b'(') + 1:rparen].decode(errors='replace')
+
+    threads = []
+    for delta, tid, stat_data, rparen, fields in heapq.nlargest(
+            MAX_THREADS, samples, key=lambda s: (s[0], -int(s[1]))):
+        threads.append({
+            "tid": int(tid),
+            "name": comm(stat_data, rparen),
+            "state": fields[0].decode(),
+            "cpu": (delta / capacity * 100) if capacity > 0 else 0.0,
+            "last_cpu": int(fields[36]),
+        })
+
+    # The main thread's comm is the process name; read it once
+    if "name" not in thread_state:
+        for delta, tid, stat_data, rparen, fields in samples:
+            if tid == str(pid):
+                thread_state["name"] = comm(stat_data, rparen)
+                break
+    busy = sum(sample[0] for sample in samples)
+    return {
+        "pid": pid,
+        "name": thread_state.get("name", "?"),
+        "count": len(samples),
+        "cpu": (busy / capacity * 100) if capacity > 0 else 0.0,
+        "gone": False,
+        "threads": threads,
+    }
 
 def check_dependencies():
     """Warn about missing optional dependencies."""
@@ -164,7 +520,7 @@ def check_dependencies():
         warnings.append("termux-api not found (battery stats unavailable)")
     
     # Check cpufreq access
-    if not os.path.exists("/sys/devices/system/cpu/cpu0/cpufreq"):
+    if not os.path.exists(procfs.sys_path("devices/system/cpu/cpu0/cpufreq")):
         warnings.append("CPU frequency scaling unavailable")
     
     return warnings
@@ -0,0 +1,71 @@
+# termux.py - Run termux-api commands off the render path
+
+import json
+import subprocess
+import threading
+import time
+
+_lock = threading.Lock()
+
+# command tuple -> {"value", "time", "attempt", "ok", "thread"}
+_results = {}
+
+
+def _run(cmd, timeout):
+    """Worker thread: run one command and store its parsed JSON output."""
+    entry = _results[cmd]
+    try:
+        result = subprocess.run(
+            list(cmd), capture_output=True, text=True, timeout=timeout
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"exit {result.returncode}")
+        value = json.loads(result.stdout)
+    except Exception:
+        entry["ok"] = False
+        return
+    with _lock:
+        entry["value"] = value
+        entry["time"] = time.monotonic()
+        entry["ok"] = True
+
+
+def query_json(cmd, max_age=30.0, timeout=5.0):
+    """
+    Latest JSON output of a termux-* command without ever blocking.
+
+    Returns the last good value (None until the first call completes) and
+    starts a refresh in a daemon thread once it is older than `max_age`
+    seconds. Attempts, failed or not, are at least `max_age` apart, a
+    refresh already in flight is never started twice, and a slow or
+    failed call keeps the previous value. A hung command never delays
+    process exit.
+
+    Returns:
+        Dict with value, age (seconds, None if never fetched) and stale,
+        which is True when the last attempt failed or a refresh is overdue
+        (older than `max_age` plus the command timeout).
+    """
+    cmd = tuple(cmd)
+    now = time.monotonic()
+    with _lock:
+        entry = _results.setdefault(
+            cmd, {"value": None, "time": None, "attempt": None, "ok": True, "thread": None}
+        )
+        age = None if entry["time"] is None else now - entry["time"]
+        in_flight = entry["thread"] is not None and entry["thread"].is_alive()
+        due = entry["attempt"] is None or now - entry["attempt"] >= max_age
+        if not in_flight and due:
+            entry["attempt"] = now
+            entry["thread"] = threading.Thread(
+                target=_run, args=(cmd, timeout), name="termux-api", daemon=True
+            )
+            entry["thread"].start()
+        value = entry["value"]
+        ok = entry["ok"]
+
+    return {
+        "value": value,
+        "age": age,
+        "stale": value is not None and (not ok or age > max_age + timeout),
+    }
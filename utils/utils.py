@@ -1,9 +1,10 @@
 # utils.py - Enhanced version with sparkline support + CPU idle tracking
 
 import shutil
-import time
 from collections import deque
 
+from utils.history import Series, DEFAULT_DEPTH
+
 
 def get_terminal_size():
     """Get current terminal dimensions."""
@@ -30,6 +31,30 @@ def create_bar(percent, width=20, filled_char="█", empty_char="░"):
     return filled_char * filled + empty_char * (width - filled)
 
 
+def create_stacked_bar(parts, width=20, empty_char="░"):
+    """
+    Progress bar made of coloured segments, as Rich markup.
+
+    Args:
+        parts: (percent, color) pairs, stacked left to right
+        width: Bar width in characters
+
+    Segment edges are placed from the running total, so rounding never
+    makes the bar longer than `width` or drifts as segments add up.
+    """
+    out = []
+    cum = 0.0
+    drawn = 0
+    for percent, color in parts:
+        cum += max(0.0, percent)
+        edge = max(0, min(width, int(cum / 100 * width)))
+        if edge > drawn:
+            out.append(f"[{color}]{'█' * (edge - drawn)}[/]")
+            drawn = edge
+    out.append(f"[dim]{empty_char * (width - drawn)}[/]")
+    return "".join(out)
+
+
 def format_bytes(bytes_val):
     """Format bytes to human readable format."""
     for unit in ["B", "KB", "MB", "GB", "TB"]:
@@ -49,47 +74,10 @@ def get_color_for_percent(percent, low=40, high=80):
         return "red"
 
 
-def format_sparkline(data_points, chars="▁▂▃▄▅▆▇█"):
-    """
-    Create a sparkline from a list of data points.
-
-    Args:
-        data_points: Iterable of numeric values
-        chars: Characters to use for sparkline (lowest to highest)
-
-    Returns:
-        String representation of sparkline
-    """
-    if not data_points:
-        return ""
-
-    pts = list(data_points)
-    if len(pts) == 0:
-        return ""
-
-    # Handle all zeros
-    if all(x == 0 for x in pts):
-        return chars[0] * len(pts)
-
-    min_val = min(pts)
-    max_val = max(pts)
-
-    # Avoid division by zero
-    if max_val == min_val:
-        return chars[len(chars) // 2] * len(pts)
-
-    out = []
-    for point in pts:
-        normalized = (point - min_val) / (max_val - min_val)
-        idx = int(normalized * (len(chars) - 1))
-        idx = max(0, min(len(chars) - 1, idx))
-        out.append(chars[idx])
-    return "".join(out)
-
-
 # Global state for various calculations
 _state = {
-    "net": {"rx": 0, "tx": 0, "time": time.time(), "rx_s": 0, "tx_s": 0},
+    # Per-interface /proc/net/dev counters at the last sample (monotonic time)
+    "net": {"ifaces": {}, "time": None},
     # cpu dict is used for /proc/stat deltas AND cpuidle deltas
     "cpu": {
         # cpuidle-based usage estimation (per cpuX)
@@ -97,20 +85,28 @@ _state = {
         # cpu_idle_t["cpu0"]    = last sample timestamp from time.monotonic()
         "cpu_idle_time": {},
         "cpu_idle_t": {},
+        # /proc/stat counters at the last sample: "cpuN_times" per core,
+        # "cpu_times" for the aggregate line (see hardware._stat_times)
     },
-    "disk_io": {"read": 0, "write": 0, "time": time.time()},
-    "history": {
-        # Store recent history for sparklines (last 10 data points)
-        "memory": deque(maxlen=10),
-        "cpu0": deque(maxlen=10),
-        "cpu1": deque(maxlen=10),
-        "cpu2": deque(maxlen=10),
-        "cpu3": deque(maxlen=10),
-        "cpu4": deque(maxlen=10),
-        "cpu5": deque(maxlen=10),
-        "cpu6": deque(maxlen=10),
-        "cpu7": deque(maxlen=10),
-    },
+    # Per-device /proc/diskstats counters at the last sample (monotonic time)
+    "disk_io": {"devices": {}, "time": None},
+    # Per-process sampler: ticks[(pid, starttime)] = utime + stime at last scan
+    # parents[pid] = ppid (updated in place); uids[(pid, starttime)] = uid
+    "procs": {"ticks": {}, "names": {}, "parents": {}, "uids": {}, "time": 0.0},
+    # PSI: stall totals (us) per (resource, some|full) at the last sample;
+    # available is None until the first read, then whether PSI exists
+    "pressure": {"available": None, "totals": {}, "time": None},
+    # Hottest thermal zone as (sample time, °C) over the last TEMP_WINDOW
+    # seconds; per policy the scaling_max_freq cap at the last sample and
+    # when it last dropped; the policies currently flagged as throttled
+    "clusters": {"temps": deque(), "stamp": None, "limits": {}, "dropped": {},
+                 "throttled": set()},
+    # Thread drilldown: {"pid", "ticks": {tid: (starttime, ticks)}, "time",
+    # "name"} while open, None otherwise
+    "threads": None,
+    # Metric name -> Series (raw ring + downsampled tiers), created on first use
+    "history": {},
+    "history_depth": DEFAULT_DEPTH,
 }
 
 
@@ -119,10 +115,18 @@ def get_state():
     return _state
 
 
+def set_history_depth(depth):
+    """Set how many raw samples each metric keeps (existing ones are resized)."""
+    depth = max(1, int(depth))
+    _state["history_depth"] = depth
+    for series in _state["history"].values():
+        series.resize(depth)
+
+
 def update_history(key, value):
     """Update historical data for sparklines."""
-    history = _state.setdefault("history", {})
-    if key in history:
-        history[key].append(value)
-    else:
-        history[key] = deque([value], maxlen=10)
+    history = _state["history"]
+    series = history.get(key)
+    if series is None:
+        series = history[key] = Series(_state["history_depth"])
+    series.append(value)